@@ -5,15 +5,148 @@ PDF_DOWNLOAD_FOLDER = "pdf_uploads"
 EXCEL_DOWNLOAD_FOLDER = "excel_outputs"
 WORD_DOWNLOAD_FOLDER = "word_outputs"
 IMAGE_DOWNLOAD_FOLDER = "image_outputs"
+OCR_DOWNLOAD_FOLDER = "ocr_outputs"
+RESULT_CACHE_FOLDER = "cache_outputs"
 
-for folder in (
+OUTPUT_FOLDERS = (
     DOWNLOAD_FOLDER,
     PDF_DOWNLOAD_FOLDER,
     EXCEL_DOWNLOAD_FOLDER,
     WORD_DOWNLOAD_FOLDER,
     IMAGE_DOWNLOAD_FOLDER,
-):
-    os.makedirs(folder, exist_ok=True)
+    OCR_DOWNLOAD_FOLDER,
+    RESULT_CACHE_FOLDER,
+)
+
+
+def ensure_folders() -> None:
+    """Create the working folders; called at startup rather than on import."""
+    for folder in OUTPUT_FOLDERS:
+        os.makedirs(folder, exist_ok=True)
+
+
+# Routers mounted by main.py, by name (see ROUTERS there). PDF conversion is off by
+# default; enabling it loads the PDF libraries only once a PDF route is used.
+ENABLED_ROUTERS = [
+    name.strip()
+    for name in os.environ.get("ENABLED_ROUTERS", "youtube,tiktok,downloads,system").split(",")
+    if name.strip()
+]
 
 CHUNK_SIZE = 1024 * 1024  # 1MB
 YOUTUBE_REMOTE_ENDPOINT = os.environ.get("YOUTUBE_REMOTE_ENDPOINT")
+
+# Shared HTTP client for YOUTUBE_REMOTE_ENDPOINT. Timeouts are in seconds; a dropped
+# transfer is resumed with a Range request up to REMOTE_MAX_RESUMES times.
+REMOTE_HTTP2 = os.environ.get("REMOTE_HTTP2", "").lower() in ("1", "true", "yes")
+REMOTE_CONNECT_TIMEOUT = float(os.environ.get("REMOTE_CONNECT_TIMEOUT", "10"))
+REMOTE_READ_TIMEOUT = float(os.environ.get("REMOTE_READ_TIMEOUT", "60"))
+REMOTE_MAX_CONNECTIONS = int(os.environ.get("REMOTE_MAX_CONNECTIONS", "20"))
+REMOTE_MAX_KEEPALIVE = int(os.environ.get("REMOTE_MAX_KEEPALIVE", "10"))
+REMOTE_MAX_RESUMES = int(os.environ.get("REMOTE_MAX_RESUMES", "3"))
+
+# Page rendering fans out over up to PDF_RENDER_WORKERS processes of the shared PDF
+# process pool once a PDF reaches this many pages; smaller ones use one at a time.
+PDF_RENDER_WORKERS = int(os.environ.get("PDF_RENDER_WORKERS", os.cpu_count() or 1))
+PDF_RENDER_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_RENDER_PARALLEL_MIN_PAGES", "16"))
+
+# Table extraction fans out the same way once the selected pages reach
+# PDF_CONVERT_PARALLEL_MIN_PAGES; DOCX conversion uses the same workers when a
+# request asks for parallel mode.
+PDF_CONVERT_WORKERS = int(os.environ.get("PDF_CONVERT_WORKERS", os.cpu_count() or 1))
+PDF_CONVERT_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_CONVERT_PARALLEL_MIN_PAGES", "8"))
+
+# OCR of scanned pages: pages without a text layer are rendered at PDF_OCR_DPI and
+# recognized by tesseract (TESSERACT_CMD) across up to PDF_OCR_WORKERS processes of
+# the shared PDF process pool. Recognized pages are cached one by one.
+PDF_OCR_WORKERS = int(os.environ.get("PDF_OCR_WORKERS", os.cpu_count() or 1))
+PDF_OCR_DPI = int(os.environ.get("PDF_OCR_DPI", "300"))
+PDF_OCR_LANG = os.environ.get("PDF_OCR_LANG", "eng")
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", "tesseract")
+
+# Disk budget for cached conversion outputs; least recently used entries are evicted.
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(1024**3)))
+
+# File cleanup: pending deletions are saved next to JANITOR_SCHEDULE_PATH, one file per
+# worker PID, so they survive restarts, and unscheduled files older than
+# JANITOR_STALE_AFTER are swept at startup.
+JANITOR_SCHEDULE_PATH = os.environ.get("JANITOR_SCHEDULE_PATH", "janitor_schedule.json")
+JANITOR_STALE_AFTER = int(os.environ.get("JANITOR_STALE_AFTER", "3600"))
+JANITOR_PERSIST_INTERVAL = float(os.environ.get("JANITOR_PERSIST_INTERVAL", "5"))
+
+# Server-sent progress events: at most one update per job every PROGRESS_STREAM_INTERVAL
+# seconds, with a keep-alive comment when nothing changes for PROGRESS_STREAM_KEEPALIVE.
+PROGRESS_STREAM_INTERVAL = float(os.environ.get("PROGRESS_STREAM_INTERVAL", "0.5"))
+PROGRESS_STREAM_KEEPALIVE = float(os.environ.get("PROGRESS_STREAM_KEEPALIVE", "15"))
+
+# How often a follow-mode file stream re-checks a growing file that has no new bytes.
+FOLLOW_POLL_INTERVAL = float(os.environ.get("FOLLOW_POLL_INTERVAL", "0.25"))
+
+# Download progress is written to the tracker at most every PROGRESS_MIN_INTERVAL
+# seconds unless it moved by PROGRESS_MIN_DELTA percent; terminal states always go out.
+PROGRESS_MIN_INTERVAL = float(os.environ.get("PROGRESS_MIN_INTERVAL", "0.5"))
+PROGRESS_MIN_DELTA = float(os.environ.get("PROGRESS_MIN_DELTA", "1.0"))
+
+# Downloads shared by several requests stay on disk until every requester fetched
+# the file, but never longer than this many seconds after completion.
+SHARED_FILE_MAX_HOLD = int(os.environ.get("SHARED_FILE_MAX_HOLD", "3600"))
+JANITOR_GUARD_RETRY = float(os.environ.get("JANITOR_GUARD_RETRY", "60"))
+
+# Admission control for download jobs: per-source concurrency and a shared bounded
+# queue. Retry-After falls back to DOWNLOAD_RETRY_AFTER_DEFAULT before any job ran.
+DOWNLOAD_CONCURRENCY = {
+    "youtube": int(os.environ.get("YOUTUBE_MAX_CONCURRENT", "4")),
+    "tiktok": int(os.environ.get("TIKTOK_MAX_CONCURRENT", "4")),
+}
+DOWNLOAD_MAX_QUEUED = int(os.environ.get("DOWNLOAD_MAX_QUEUED", "100"))
+DOWNLOAD_RETRY_AFTER_DEFAULT = int(os.environ.get("DOWNLOAD_RETRY_AFTER_DEFAULT", "30"))
+
+# yt-dlp metadata is reused for this many seconds (format URLs expire upstream).
+METADATA_CACHE_TTL = float(os.environ.get("METADATA_CACHE_TTL", "300"))
+METADATA_CACHE_MAX_ENTRIES = int(os.environ.get("METADATA_CACHE_MAX_ENTRIES", "256"))
+
+# Download job storage: "memory" (per process) or "sqlite" to share jobs between the
+# workers of one host and keep them across restarts. Progress writes are batched
+# every JOB_STORE_FLUSH_INTERVAL seconds; jobs owned by other workers are polled.
+# Unfinished jobs of a worker that stopped renewing its JOB_STORE_LEASE are failed.
+JOB_STORE_BACKEND = os.environ.get("JOB_STORE_BACKEND", "memory")
+JOB_STORE_PATH = os.environ.get("JOB_STORE_PATH", "jobs.sqlite3")
+JOB_STORE_FLUSH_INTERVAL = float(os.environ.get("JOB_STORE_FLUSH_INTERVAL", "0.25"))
+JOB_STORE_POLL_INTERVAL = float(os.environ.get("JOB_STORE_POLL_INTERVAL", "1.0"))
+JOB_STORE_LEASE = float(os.environ.get("JOB_STORE_LEASE", "30"))
+
+# Finished download jobs are forgotten JOB_RETENTION seconds after they end. Beyond
+# JOB_MAX_FINISHED per worker, older ones go sooner, but only once they finished at
+# least JOB_MIN_AGE seconds ago and hold no shared file that is still awaited.
+# Listings page at most JOB_LIST_MAX_LIMIT jobs.
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", "3600"))
+JOB_MAX_FINISHED = int(os.environ.get("JOB_MAX_FINISHED", "1000"))
+JOB_MIN_AGE = float(os.environ.get("JOB_MIN_AGE", "600"))
+JOB_LIST_MAX_LIMIT = int(os.environ.get("JOB_LIST_MAX_LIMIT", "200"))
+
+# Batch submission: at most BATCH_MAX_URLS URLs or PDF_BATCH_MAX_FILES PDFs per
+# request. Bulk status lookups accept up to BATCH_MAX_URLS process ids.
+BATCH_MAX_URLS = int(os.environ.get("BATCH_MAX_URLS", "500"))
+PDF_BATCH_MAX_FILES = int(os.environ.get("PDF_BATCH_MAX_FILES", "50"))
+
+# PDF uploads are streamed straight to disk and rejected once they pass this size.
+PDF_UPLOAD_MAX_BYTES = int(os.environ.get("PDF_UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+
+# Single-page rendering of uploaded documents: documents are kept PDF_DOCUMENT_TTL
+# seconds, at most PDF_OPEN_DOCUMENTS stay open, and rendered pages are cached in
+# memory up to PDF_PAGE_MEMORY_CACHE_BYTES on top of the result cache on disk.
+PDF_DOCUMENT_TTL = int(os.environ.get("PDF_DOCUMENT_TTL", "3600"))
+PDF_OPEN_DOCUMENTS = int(os.environ.get("PDF_OPEN_DOCUMENTS", "8"))
+PDF_PAGE_MEMORY_CACHE_BYTES = int(
+    os.environ.get("PDF_PAGE_MEMORY_CACHE_BYTES", str(64 * 1024 * 1024))
+)
+PDF_PAGE_DEFAULT_DPI = int(os.environ.get("PDF_PAGE_DEFAULT_DPI", "96"))
+PDF_PAGE_MAX_DPI = int(os.environ.get("PDF_PAGE_MAX_DPI", "300"))
+PDF_THUMBNAIL_DPI = int(os.environ.get("PDF_THUMBNAIL_DPI", "24"))
+
+# Dedicated executors: CPU-heavy PDF work runs in PDF_PROCESS_WORKERS processes,
+# PDF jobs are driven from PDF_THREADS threads, and blocking download work (yt-dlp,
+# file reads) gets DOWNLOAD_THREADS threads of its own.
+PDF_PROCESS_WORKERS = int(os.environ.get("PDF_PROCESS_WORKERS", os.cpu_count() or 1))
+PDF_THREADS = int(os.environ.get("PDF_THREADS", "4"))
+DOWNLOAD_THREADS = int(os.environ.get("DOWNLOAD_THREADS", "16"))
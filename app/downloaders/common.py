@@ -1,7 +1,105 @@
+import copy
 import os
-from typing import Callable, Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
 
-import yt_dlp
+from app.config import METADATA_CACHE_MAX_ENTRIES, METADATA_CACHE_TTL
+from app.services.metrics import METRICS, record_download, track_stage
+from app.utils.url_ops import normalize_media_url
+
+# yt_dlp is imported on first use; it is slow to load and not every worker downloads.
+DEFAULT_YDL_OPTIONS = {
+    "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
+    "merge_output_format": "mp4",
+    "noplaylist": True,
+    "quiet": True,
+}
+
+
+class MetadataCache:
+    """Thread-safe TTL and size bounded cache of yt-dlp info dicts keyed by URL."""
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, url: str) -> Optional[Dict]:
+        key = normalize_media_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, url: str, info: Dict) -> None:
+        key = normalize_media_url(url)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+
+METADATA_CACHE = MetadataCache(METADATA_CACHE_TTL, METADATA_CACHE_MAX_ENTRIES)
+METRICS.add_stats("metadata_cache", METADATA_CACHE.stats)
+
+
+def extract_video_info(url: str) -> Dict:
+    """Return yt-dlp metadata for url, reusing a cached extraction while it is fresh."""
+    import yt_dlp
+
+    info = METADATA_CACHE.get(url)
+    if info is None:
+        with track_stage("ytdlp_extract"), yt_dlp.YoutubeDL(DEFAULT_YDL_OPTIONS) as ydl:
+            info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+        METADATA_CACHE.put(url, info)
+    return info
+
+
+def summarize_video_info(info: Dict) -> Dict[str, object]:
+    """Reduce a yt-dlp info dict to the fields clients need for a preview."""
+    selected = info.get("requested_formats") or [info]
+    sizes = [fmt.get("filesize") or fmt.get("filesize_approx") for fmt in selected]
+    return {
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "uploader": info.get("uploader"),
+        "duration": info.get("duration"),
+        "thumbnail": info.get("thumbnail"),
+        "estimated_size": sum(sizes) if sizes and all(sizes) else None,
+        "selected_format": info.get("format_id"),
+        "formats": [
+            {
+                "format_id": fmt.get("format_id"),
+                "ext": fmt.get("ext"),
+                "resolution": fmt.get("resolution"),
+                "fps": fmt.get("fps"),
+                "vcodec": fmt.get("vcodec"),
+                "acodec": fmt.get("acodec"),
+                "filesize": fmt.get("filesize") or fmt.get("filesize_approx"),
+            }
+            for fmt in info.get("formats") or []
+        ],
+    }
 
 
 def download_video(
@@ -11,13 +109,9 @@ def download_video(
     progress_callback: Optional[Callable[[Dict], None]] = None,
 ) -> str:
     """Download remote video content to disk and return the resulting filename."""
-    ydl_opts = {
-        "format": "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
-        "outtmpl": output_template,
-        "merge_output_format": "mp4",
-        "noplaylist": True,
-        "quiet": True,
-    }
+    import yt_dlp
+
+    ydl_opts = dict(DEFAULT_YDL_OPTIONS, outtmpl=output_template)
 
     if custom_options:
         ydl_opts.update(custom_options)
@@ -25,8 +119,19 @@ def download_video(
     if progress_callback:
         ydl_opts["progress_hooks"] = [progress_callback]
 
+    info = METADATA_CACHE.get(url)
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url)
+        if info is None:
+            # Extract separately so extraction and transfer are timed apart.
+            with track_stage("ytdlp_extract"):
+                info = ydl.extract_info(url, download=False)
+        else:
+            info = copy.deepcopy(info)
+        # Formats are (re-)selected with these options before downloading.
+        started = time.perf_counter()
+        with track_stage("ytdlp_transfer"):
+            info = ydl.process_ie_result(info, download=True)
+        transfer_seconds = time.perf_counter() - started
         filename = ydl.prepare_filename(info)
         if not filename.lower().endswith(".mp4"):
             filename = os.path.splitext(filename)[0] + ".mp4"
@@ -34,4 +139,6 @@ def download_video(
     if not os.path.exists(filename):
         raise FileNotFoundError("Failed to download video.")
 
+    record_download("ytdlp", os.path.getsize(filename), transfer_seconds)
+
     return filename
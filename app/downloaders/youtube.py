@@ -1,17 +1,34 @@
 import asyncio
+import importlib.util
+import logging
 import os
+import time
 import uuid
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from urllib.parse import unquote
 
-import httpx
-
-from app.config import DOWNLOAD_FOLDER, YOUTUBE_REMOTE_ENDPOINT
+from app.config import (
+    DOWNLOAD_FOLDER,
+    REMOTE_CONNECT_TIMEOUT,
+    REMOTE_HTTP2,
+    REMOTE_MAX_CONNECTIONS,
+    REMOTE_MAX_KEEPALIVE,
+    REMOTE_MAX_RESUMES,
+    REMOTE_READ_TIMEOUT,
+    YOUTUBE_REMOTE_ENDPOINT,
+)
 from app.downloaders.common import download_video
-from app.services.download_tracker import DOWNLOAD_TRACKER
+from app.services.executors import DOWNLOAD_EXECUTOR
+from app.services.metrics import observe_stage, record_download
+from app.services.progress import ProgressReporter
 from app.utils.file_ops import delete_file_later
 
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
 
 def extract_filename_from_disposition(content_disposition: str) -> Optional[str]:
     """Return filename value from a Content-Disposition header if present."""
@@ -42,69 +59,137 @@ class BaseYouTubeDownloader(ABC):
         """Download video and update tracker status."""
         raise NotImplementedError
 
+    async def aclose(self) -> None:
+        """Release resources held by the downloader."""
+
+
+def parse_content_range_total(content_range: str) -> Optional[int]:
+    """Return the complete length from a ``bytes start-end/total`` header."""
+    _, _, total = content_range.rpartition("/")
+    return int(total) if total.strip().isdigit() else None
+
+
+def build_remote_client() -> "httpx.AsyncClient":
+    """Shared client with pooled keep-alive connections and bounded timeouts."""
+    import httpx
+
+    http2 = REMOTE_HTTP2 and importlib.util.find_spec("h2") is not None
+    if REMOTE_HTTP2 and not http2:
+        logger.warning("REMOTE_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1")
+    return httpx.AsyncClient(
+        http2=http2,
+        follow_redirects=True,
+        timeout=httpx.Timeout(REMOTE_READ_TIMEOUT, connect=REMOTE_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=REMOTE_MAX_CONNECTIONS,
+            max_keepalive_connections=REMOTE_MAX_KEEPALIVE,
+        ),
+    )
+
 
 class RemoteYouTubeDownloader(BaseYouTubeDownloader):
     """Streams downloads through a remote API endpoint."""
 
-    def __init__(self, endpoint: str, download_folder: str) -> None:
+    def __init__(
+        self,
+        endpoint: str,
+        download_folder: str,
+        client: Optional["httpx.AsyncClient"] = None,
+        max_resumes: int = REMOTE_MAX_RESUMES,
+    ) -> None:
         self.endpoint = endpoint
         self.download_folder = download_folder
+        self.max_resumes = max_resumes
+        self._client = client
+        self._owns_client = client is None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            self._client = build_remote_client()
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def download(self, video_url: str, process_id: str) -> None:
+        import httpx
+
         params = {"url": video_url}
-        DOWNLOAD_TRACKER.update_job(process_id, status="running", progress=0.0)
-
-        async with httpx.AsyncClient(timeout=None) as client:
-            try:
-                async with client.stream(
-                    "GET", self.endpoint, params=params, follow_redirects=True
-                ) as response:
-                    if response.status_code >= 400:
-                        error_body = (await response.aread()).decode(errors="ignore")
-                        raise RuntimeError(
-                            f"Remote API error ({response.status_code}): {error_body.strip() or 'unexpected response'}"
-                        )
-
-                    remote_name = extract_filename_from_disposition(
-                        response.headers.get("content-disposition", "")
-                    )
-                    ext = os.path.splitext(remote_name)[1] if remote_name else ".mp4"
-                    filename = f"{uuid.uuid4().hex}{ext}"
-                    file_path = os.path.join(self.download_folder, filename)
-
-                    total_bytes_header = response.headers.get("content-length")
-                    total_bytes = int(total_bytes_header) if total_bytes_header else None
-                    if total_bytes:
-                        DOWNLOAD_TRACKER.update_job(
-                            process_id, total_bytes=total_bytes, progress=0.0
-                        )
-
-                    bytes_downloaded = 0
-                    with open(file_path, "wb") as file_handle:
-                        async for chunk in response.aiter_bytes():
-                            if chunk:
-                                file_handle.write(chunk)
-                                bytes_downloaded += len(chunk)
-                                progress = (
-                                    (bytes_downloaded / total_bytes) * 100
-                                    if total_bytes
-                                    else 0.0
-                                )
-                                DOWNLOAD_TRACKER.update_job(
-                                    process_id,
-                                    bytes_downloaded=bytes_downloaded,
-                                    progress=progress,
-                                )
-            except httpx.RequestError as exc:
-                raise RuntimeError(f"Failed to reach remote API: {exc}") from exc
-
-        DOWNLOAD_TRACKER.update_job(
-            process_id,
-            status="completed",
-            progress=100.0,
-            file_path=file_path,
-            suggested_name=remote_name or filename,
-        )
+        reporter = ProgressReporter(process_id)
+        reporter.start()
+
+        file_path = None
+        remote_name = None
+        filename = None
+        total_bytes = None
+        bytes_downloaded = 0
+        attempt = 0
+        started = time.perf_counter()
+        try:
+            while True:
+                # After a dropped connection, ask only for the bytes not yet on disk.
+                headers = {"Range": f"bytes={bytes_downloaded}-"} if bytes_downloaded else {}
+                try:
+                    async with self.client.stream(
+                        "GET", self.endpoint, params=params, headers=headers
+                    ) as response:
+                        if bytes_downloaded and response.status_code == 416:
+                            break
+                        if response.status_code >= 400:
+                            error_body = (await response.aread()).decode(errors="ignore")
+                            raise RuntimeError(
+                                f"Remote API error ({response.status_code}): {error_body.strip() or 'unexpected response'}"
+                            )
+
+                        if file_path is None:
+                            remote_name = extract_filename_from_disposition(
+                                response.headers.get("content-disposition", "")
+                            )
+                            ext = os.path.splitext(remote_name)[1] if remote_name else ".mp4"
+                            filename = f"{uuid.uuid4().hex}{ext}"
+                            file_path = os.path.join(self.download_folder, filename)
+                            reporter.stream_from(file_path, remote_name or filename)
+
+                        if response.status_code == 206:
+                            total_bytes = parse_content_range_total(
+                                response.headers.get("content-range", "")
+                            ) or total_bytes
+                        else:
+                            # The server ignored the Range header, so start over.
+                            bytes_downloaded = 0
+                            total_bytes_header = response.headers.get("content-length")
+                            total_bytes = int(total_bytes_header) if total_bytes_header else None
+                        if total_bytes:
+                            reporter.update(bytes_downloaded, total_bytes, force=True)
+
+                        with open(file_path, "ab" if bytes_downloaded else "wb") as file_handle:
+                            async for chunk in response.aiter_bytes():
+                                if chunk:
+                                    file_handle.write(chunk)
+                                    bytes_downloaded += len(chunk)
+                                    reporter.update(bytes_downloaded, total_bytes)
+                    break
+                except httpx.TransportError as exc:
+                    attempt += 1
+                    if attempt > self.max_resumes:
+                        raise RuntimeError(f"Failed to reach remote API: {exc}") from exc
+                    await asyncio.sleep(min(0.5 * 2 ** attempt, 10))
+                except httpx.RequestError as exc:
+                    raise RuntimeError(f"Failed to reach remote API: {exc}") from exc
+        except BaseException:
+            # Keep the partial file a little while for anyone still following it.
+            if file_path:
+                delete_file_later(file_path)
+            raise
+
+        transfer_seconds = time.perf_counter() - started
+        observe_stage("remote_transfer", transfer_seconds)
+        record_download("remote", bytes_downloaded, transfer_seconds)
+        reporter.update(bytes_downloaded, total_bytes, force=True)
+        reporter.complete(file_path, remote_name or filename)
         delete_file_later(file_path, delay=600)
 
 
@@ -118,40 +203,18 @@ class LocalYouTubeDownloader(BaseYouTubeDownloader):
         output_template = os.path.join(
             self.download_folder, "%(id)s_%(title)s.%(ext)s"
         )
-        DOWNLOAD_TRACKER.update_job(process_id, status="running", progress=0.0)
-
-        def hook(data):
-            status = data.get("status")
-            if status == "downloading":
-                downloaded = int(data.get("downloaded_bytes") or 0)
-                total = data.get("total_bytes") or data.get("total_bytes_estimate")
-                progress = (
-                    (downloaded / total) * 100 if total and total > 0 else 0.0
-                )
-                DOWNLOAD_TRACKER.update_job(
-                    process_id,
-                    bytes_downloaded=downloaded,
-                    total_bytes=int(total) if total else None,
-                    progress=progress,
-                )
-            elif status == "finished":
-                DOWNLOAD_TRACKER.update_job(process_id, progress=100.0)
-
-        file_path = await asyncio.to_thread(
+        reporter = ProgressReporter(process_id)
+        reporter.start()
+
+        file_path = await DOWNLOAD_EXECUTOR.run(
             download_video,
             video_url,
             output_template,
             None,
-            hook,
+            reporter.ytdlp_hook,
         )
 
-        DOWNLOAD_TRACKER.update_job(
-            process_id,
-            status="completed",
-            progress=100.0,
-            file_path=file_path,
-            suggested_name=os.path.basename(file_path),
-        )
+        reporter.complete(file_path, os.path.basename(file_path))
         delete_file_later(file_path, delay=600)
 
 
@@ -1,13 +1,220 @@
+import asyncio
+import json
 import os
+from typing import AsyncIterator, BinaryIO, Dict, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.services.download_tracker import DOWNLOAD_TRACKER
-from app.utils.file_ops import ascii_filename
+from app.config import (
+    BATCH_MAX_URLS,
+    CHUNK_SIZE,
+    FOLLOW_POLL_INTERVAL,
+    JOB_LIST_MAX_LIMIT,
+    JOB_STORE_POLL_INTERVAL,
+    PROGRESS_STREAM_INTERVAL,
+    PROGRESS_STREAM_KEEPALIVE,
+)
+from app.services.download_tracker import (
+    DOWNLOAD_TRACKER,
+    TERMINAL_STATUSES,
+    DownloadBatch,
+    DownloadJob,
+    JobWatcher,
+)
+from app.services.executors import DOWNLOAD_EXECUTOR
+from app.utils.file_ops import ascii_filename, iter_zip_files
 
 router = APIRouter(prefix="/downloads", tags=["Download Jobs"])
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_event(event: str, payload: Dict[str, object]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def job_events(process_ids: List[str], interval: float) -> AsyncIterator[str]:
+    """Push job changes, at most once per interval, until every job is finished."""
+    watcher = JobWatcher(asyncio.get_running_loop())
+    DOWNLOAD_TRACKER.watch(process_ids, watcher)
+    try:
+        last_sent: Dict[str, Dict[str, object]] = {}
+        active = set(process_ids)
+        idle = 0.0
+        while active:
+            payloads = DOWNLOAD_TRACKER.serialize_jobs(sorted(active))
+            for process_id, payload in payloads.items():
+                if payload is None:
+                    yield format_event("missing", {"process_id": process_id})
+                    active.discard(process_id)
+                    continue
+                if payload != last_sent.get(process_id):
+                    last_sent[process_id] = payload
+                    yield format_event("progress", payload)
+                if payload["status"] in TERMINAL_STATUSES:
+                    active.discard(process_id)
+            if not active:
+                break
+
+            # Jobs run by another worker change without notifying us; poll the store.
+            polling = not all(DOWNLOAD_TRACKER.is_local(pid) for pid in active)
+            timeout = JOB_STORE_POLL_INTERVAL if polling else PROGRESS_STREAM_KEEPALIVE
+            if not await watcher.wait(timeout):
+                idle += timeout
+                if idle >= PROGRESS_STREAM_KEEPALIVE:
+                    idle = 0.0
+                    yield ": keep-alive\n\n"
+                continue
+            idle = 0.0
+            # Let a burst of updates settle so the client sees one event per interval.
+            await asyncio.sleep(interval)
+    finally:
+        DOWNLOAD_TRACKER.unwatch(process_ids, watcher)
+
+
+def events_response(process_ids: List[str], interval: float) -> StreamingResponse:
+    payloads = DOWNLOAD_TRACKER.serialize_jobs(process_ids)
+    if not process_ids or any(payload is None for payload in payloads.values()):
+        raise HTTPException(status_code=404, detail="Process not found")
+    return StreamingResponse(
+        job_events(process_ids, interval),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("")
+async def list_downloads(
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=JOB_LIST_MAX_LIMIT),
+):
+    total, jobs = DOWNLOAD_TRACKER.list_jobs(status, source, offset, limit)
+    return {"total": total, "offset": offset, "limit": limit, "jobs": jobs}
+
+
+@router.get("/events")
+async def stream_downloads_events(
+    ids: str = Query(..., description="Comma-separated process identifiers"),
+    interval: float = Query(PROGRESS_STREAM_INTERVAL, ge=0.0),
+):
+    process_ids = list(dict.fromkeys(pid for pid in ids.split(",") if pid))
+    return events_response(process_ids, interval)
+
+
+@router.post("/status")
+async def get_download_statuses(
+    process_ids: List[str] = Body(..., embed=True, min_length=1, max_length=BATCH_MAX_URLS),
+):
+    """Read many jobs in one tracker lookup; unknown ids map to null."""
+    return {"jobs": DOWNLOAD_TRACKER.serialize_jobs(process_ids)}
+
+
+def find_batch(batch_id: str) -> DownloadBatch:
+    batch = DOWNLOAD_TRACKER.get_batch(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+
+@router.get("/batches/{batch_id}")
+async def get_batch_status(batch_id: str):
+    batch = find_batch(batch_id)
+    payloads = DOWNLOAD_TRACKER.serialize_jobs(batch.process_ids)
+    counts: Dict[str, int] = {}
+    for payload in payloads.values():
+        status = payload["status"] if payload else "missing"
+        counts[status] = counts.get(status, 0) + 1
+    return {
+        "batch_id": batch.batch_id,
+        "kind": batch.kind,
+        "created_at": batch.created_at,
+        "finished": all(
+            payload is None or payload["status"] in TERMINAL_STATUSES
+            for payload in payloads.values()
+        ),
+        "counts": counts,
+        "jobs": [payloads[process_id] for process_id in batch.process_ids],
+    }
+
+
+@router.get("/batches/{batch_id}/events")
+async def stream_batch_events(
+    batch_id: str, interval: float = Query(PROGRESS_STREAM_INTERVAL, ge=0.0)
+):
+    batch = find_batch(batch_id)
+    return events_response(list(dict.fromkeys(batch.process_ids)), interval)
+
+
+def unique_arcname(name: str, used: Set[str]) -> str:
+    stem, ext = os.path.splitext(name.replace("/", "_").replace("\\", "_"))
+    candidate = stem + ext
+    counter = 1
+    while candidate in used:
+        counter += 1
+        candidate = f"{stem}_{counter}{ext}"
+    used.add(candidate)
+    return candidate
+
+
+def release_consumers(process_ids: List[str]) -> None:
+    for process_id in process_ids:
+        DOWNLOAD_TRACKER.release_consumer(process_id)
+
+
+@router.get("/batches/{batch_id}/file")
+async def get_batch_file(batch_id: str):
+    """Stream every finished file of a batch as one ZIP, with a batch.json manifest."""
+    batch = find_batch(batch_id)
+    payloads = DOWNLOAD_TRACKER.serialize_jobs(batch.process_ids)
+    if any(
+        payload is not None and payload["status"] not in TERMINAL_STATUSES
+        for payload in payloads.values()
+    ):
+        raise HTTPException(status_code=400, detail="Batch not finished")
+
+    files: List[Tuple[str, str]] = []
+    manifest: List[Dict[str, object]] = []
+    used: Set[str] = set()
+    for process_id in batch.process_ids:
+        payload = payloads[process_id]
+        if payload is None:
+            manifest.append({"process_id": process_id, "status": "missing"})
+            continue
+        entry = {"process_id": process_id, "url": payload["url"], "status": payload["status"]}
+        if payload["status"] == "completed" and payload["file_exists"]:
+            file_path = payload["file_path"]
+            name = unique_arcname(payload["suggested_name"] or os.path.basename(file_path), used)
+            files.append((name, file_path))
+            entry["file"] = name
+        else:
+            entry["error"] = payload["error"] or "File is no longer available"
+        manifest.append(entry)
+    if not files:
+        raise HTTPException(status_code=400, detail="Batch has no files to download")
+
+    skipped: List[str] = []
+
+    def manifest_entry():
+        # Files deleted after the batch finished are reported instead of zipped.
+        for entry in manifest:
+            if entry.get("file") in skipped:
+                entry["error"] = "File is no longer available"
+                del entry["file"]
+        yield "batch.json", json.dumps(manifest, indent=2).encode()
+
+    # Entries are stored, not deflated: the files are media or already compressed.
+    chunks = iter_zip_files(files, manifest_entry(), CHUNK_SIZE, skipped)
+    return StreamingResponse(
+        DOWNLOAD_EXECUTOR.iterate(chunks),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch.batch_id}.zip"'},
+        background=BackgroundTask(release_consumers, batch.process_ids),
+    )
+
 
 @router.get("/{process_id}")
 async def get_download_status(process_id: str):
@@ -17,13 +224,106 @@ async def get_download_status(process_id: str):
     return payload
 
 
+@router.get("/{process_id}/events")
+async def stream_download_events(
+    process_id: str, interval: float = Query(PROGRESS_STREAM_INTERVAL, ge=0.0)
+):
+    return events_response([process_id], interval)
+
+
+def readable_path(job: DownloadJob) -> Optional[str]:
+    """File a follower should read: the finished file, else the one being written."""
+    if job.status == "completed":
+        return job.file_path
+    return job.partial_path
+
+
+async def wait_for_stream_start(process_id: str) -> DownloadJob:
+    """Wait until the job has bytes on disk to follow, or has finished."""
+    watcher = JobWatcher(asyncio.get_running_loop())
+    DOWNLOAD_TRACKER.watch([process_id], watcher)
+    try:
+        while True:
+            job = DOWNLOAD_TRACKER.get_job(process_id)
+            if not job:
+                raise HTTPException(status_code=404, detail="Process not found")
+            if job.status in TERMINAL_STATUSES:
+                return job
+            path = readable_path(job)
+            if path and os.path.exists(path):
+                return job
+            await watcher.wait(FOLLOW_POLL_INTERVAL)
+    finally:
+        DOWNLOAD_TRACKER.unwatch([process_id], watcher)
+
+
+async def follow_file(process_id: str) -> AsyncIterator[bytes]:
+    """Yield a download's bytes as they land on disk until the job completes."""
+    watcher = JobWatcher(asyncio.get_running_loop())
+    DOWNLOAD_TRACKER.watch([process_id], watcher)
+    handle: Optional[BinaryIO] = None
+    try:
+        while True:
+            # Snapshot the job before reading: an empty read after a completed
+            # snapshot means everything has been sent.
+            job = DOWNLOAD_TRACKER.get_job(process_id)
+            if not job:
+                raise RuntimeError("Process disappeared while streaming")
+            if job.status == "failed":
+                raise RuntimeError(job.error or "Download failed")
+
+            if handle is None:
+                path = readable_path(job)
+                if path and os.path.exists(path):
+                    handle = open(path, "rb")
+
+            if handle is not None:
+                chunk = await DOWNLOAD_EXECUTOR.run(handle.read, CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+                    continue
+                if os.fstat(handle.fileno()).st_size < handle.tell():
+                    raise RuntimeError("Download restarted while streaming")
+                if job.status == "completed":
+                    return
+            elif job.status == "completed":
+                raise RuntimeError("Downloaded file is no longer available")
+
+            await watcher.wait(FOLLOW_POLL_INTERVAL)
+    finally:
+        if handle is not None:
+            handle.close()
+        DOWNLOAD_TRACKER.unwatch([process_id], watcher)
+
+
 @router.get("/{process_id}/file")
-async def get_downloaded_file(process_id: str):
+async def get_downloaded_file(process_id: str, follow: bool = False):
     job = DOWNLOAD_TRACKER.get_job(process_id)
     if not job:
         raise HTTPException(status_code=404, detail="Process not found")
+
+    if follow and job.status != "completed":
+        # Early failures (such as extraction errors) still get a proper error status;
+        # a failure after bytes were sent aborts the response mid-stream.
+        job = await wait_for_stream_start(process_id)
+        if job.status == "failed":
+            raise HTTPException(status_code=502, detail=job.error or "Download failed")
+        if job.status != "completed":
+            download_name = job.suggested_name or os.path.basename(job.partial_path)
+            safe_filename = ascii_filename(download_name)
+            return StreamingResponse(
+                follow_file(process_id),
+                media_type="application/octet-stream",
+                headers={"Content-Disposition": f'attachment; filename="{safe_filename}"'},
+                background=BackgroundTask(DOWNLOAD_TRACKER.release_consumer, process_id),
+            )
+
     if job.status != "completed" or not job.file_path or not os.path.exists(job.file_path):
         raise HTTPException(status_code=400, detail="File not ready")
 
     safe_filename = ascii_filename(job.suggested_name or os.path.basename(job.file_path))
-    return FileResponse(job.file_path, filename=safe_filename)
+    return FileResponse(
+        job.file_path,
+        filename=safe_filename,
+        background=BackgroundTask(DOWNLOAD_TRACKER.release_consumer, process_id),
+    )
@@ -1,127 +1,564 @@
 import os
 import asyncio
-import shutil
 import uuid
+from typing import Callable, Dict, Iterator, Literal, NamedTuple, Optional, Tuple
 
-from fastapi import APIRouter, File, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from app.config import (
     EXCEL_DOWNLOAD_FOLDER,
     IMAGE_DOWNLOAD_FOLDER,
+    JOB_RETENTION,
+    OCR_DOWNLOAD_FOLDER,
+    PDF_BATCH_MAX_FILES,
+    PDF_DOCUMENT_TTL,
     PDF_DOWNLOAD_FOLDER,
+    PDF_OCR_DPI,
+    PDF_OCR_LANG,
+    PDF_PAGE_DEFAULT_DPI,
+    PDF_PAGE_MAX_DPI,
+    PDF_THUMBNAIL_DPI,
     WORD_DOWNLOAD_FOLDER,
 )
-from app.utils.file_ops import (
-    ascii_filename,
-    delete_file_later,
-    safe_stem,
-    save_upload_file,
-)
+from app.services.download_tracker import DOWNLOAD_TRACKER
+from app.services.executors import PDF_EXECUTOR
+from app.services.page_renderer import PAGE_RENDERER, DocumentNotFound
+from app.services.result_cache import RESULT_CACHE
+from app.utils.file_ops import ascii_filename, delete_file_later, safe_stem
 from app.utils.pdf_ops import (
+    ImageOptions,
+    OcrOptions,
+    ProgressCallback,
     convert_pdf_tables_to_excel,
     convert_pdf_to_docx,
     create_images_zip,
+    ocr_pdf,
+    open_images_zip_stream,
+    read_images_manifest,
+)
+from app.utils.upload_ops import (
+    ReceivedUpload,
+    UploadRejected,
+    pdf_upload_openapi,
+    receive_pdf_upload,
+    receive_pdf_uploads,
 )
 
 router = APIRouter(prefix="/pdf", tags=["PDF"])
 
 
-@router.post("/to-excel")
-async def pdf_to_excel(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".pdf"):
-        return {"error": "Please upload a PDF file."}
+def attachment_response(
+    file_path: str, download_name: str, extra_headers: Optional[Dict[str, str]] = None
+) -> FileResponse:
+    """Serve a file as an attachment with an ASCII-safe name."""
+    safe_filename = ascii_filename(download_name)
+    headers = {"Content-Disposition": f'attachment; filename="{safe_filename}"'}
+    headers.update(extra_headers or {})
+    return FileResponse(file_path, filename=safe_filename, headers=headers)
+
+
+def image_archive_response(zip_path: str, download_name: str) -> FileResponse:
+    """Serve an image archive with its manifest summary as response headers."""
+    summary = read_images_manifest(zip_path)
+    headers = {
+        "X-Page-Count": str(summary["pages"]),
+        "X-Image-Bytes": str(summary["total_bytes"]),
+        "X-Render-Ms": str(summary["render_ms"]),
+        "X-Encode-Ms": str(summary["encode_ms"]),
+    }
+    return attachment_response(zip_path, download_name, headers)
+
+
+def image_query(default_dpi: int) -> Callable[..., ImageOptions]:
+    """Build a dependency that reads image encoding options from the query string."""
 
-    pdf_path = await save_upload_file(file, PDF_DOWNLOAD_FOLDER)
+    def dependency(
+        format: Literal["png", "jpeg", "webp"] = "png",
+        dpi: int = Query(default_dpi, ge=1, le=PDF_PAGE_MAX_DPI),
+        zoom: Optional[float] = Query(
+            None, gt=0, description="Alternative to dpi; 1.0 is 72 DPI"
+        ),
+        quality: int = Query(85, ge=1, le=100, description="JPEG and WebP quality"),
+        grayscale: bool = False,
+    ) -> ImageOptions:
+        if zoom is not None:
+            dpi = round(72 * zoom)
+            if not 1 <= dpi <= PDF_PAGE_MAX_DPI:
+                raise HTTPException(status_code=400, detail="Zoom is out of range.")
+        try:
+            return ImageOptions(format, dpi, quality, grayscale).validate()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    base_name = safe_stem(file.filename)
-    unique_id = uuid.uuid4().hex
-    excel_filename = f"{base_name}_{unique_id}.xlsx"
-    excel_path = os.path.join(EXCEL_DOWNLOAD_FOLDER, excel_filename)
+    return dependency
 
+
+def ocr_query(
+    output: Literal["text", "pdf"] = Query(
+        "text", description="Plain text, or the PDF with a searchable text layer"
+    ),
+    lang: str = Query(
+        PDF_OCR_LANG,
+        pattern=r"^[A-Za-z_]+(\+[A-Za-z_]+)*$",
+        description='Tesseract languages such as "eng" or "eng+deu"',
+    ),
+    dpi: int = Query(PDF_OCR_DPI, ge=72, le=600),
+    force: bool = Query(False, description="Also recognize pages that already have text"),
+) -> OcrOptions:
+    """Dependency that reads OCR options from the query string."""
     try:
-        await asyncio.to_thread(convert_pdf_tables_to_excel, pdf_path, excel_path)
+        return OcrOptions(output, lang, dpi, force).validate()
     except ValueError as e:
-        if os.path.exists(excel_path):
-            os.remove(excel_path)
-        delete_file_later(pdf_path)
-        return {"error": str(e)}
-    except Exception as e:
-        if os.path.exists(excel_path):
-            os.remove(excel_path)
-        delete_file_later(pdf_path)
-        return {"error": f"Failed to convert PDF: {str(e)}"}
+        raise HTTPException(status_code=400, detail=str(e))
 
-    delete_file_later(pdf_path)
-    delete_file_later(excel_path, delay=600)
 
-    safe_filename = ascii_filename(os.path.basename(excel_path))
-    headers = {"Content-Disposition": f'attachment; filename="{safe_filename}"'}
-    return FileResponse(excel_path, filename=safe_filename, headers=headers)
+def conversion_error(exc: Exception) -> str:
+    """Message returned to clients when a conversion fails."""
+    if isinstance(exc, ValueError):
+        return str(exc)
+    return f"Failed to convert PDF: {str(exc)}"
+
+
+def tee_to_cache(chunks: Iterator[bytes], cache_key: str, partial_path: str) -> Iterator[bytes]:
+    """Pass streamed chunks through while saving them, caching the file once complete."""
+    try:
+        with open(partial_path, "wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                yield chunk
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    RESULT_CACHE.put(cache_key, partial_path, ".zip")
+
+
+def job_progress(process_id: str) -> ProgressCallback:
+    """Build a callback that reports page-level progress to the download tracker."""
+
+    def report(pages_processed: int, total_pages: int) -> None:
+        DOWNLOAD_TRACKER.update_job(
+            process_id,
+            pages_processed=pages_processed,
+            total_pages=total_pages,
+            progress=(pages_processed / total_pages) * 100 if total_pages else 0.0,
+        )
+
+    return report
+
+
+class Conversion(NamedTuple):
+    """One upload's conversion: the function to run, its output and its cache entry."""
+
+    upload_name: str
+    download_name: str
+    pdf_path: str
+    output_path: str
+    cache_key: str
+    ext: str
+    convert: Callable[..., None]
+    args: Tuple
+    cached_path: Optional[str]
+
+
+def plan_conversion(
+    upload: ReceivedUpload,
+    folder: str,
+    ext: str,
+    kind: str,
+    convert: Callable[..., None],
+    args: Tuple,
+    **key_options,
+) -> Conversion:
+    """Name the output, look the result up in the cache and drop the upload on a hit."""
+    download_name = f"{safe_stem(upload.filename)}_{uuid.uuid4().hex}{ext}"
+    cache_key = RESULT_CACHE.make_key(upload.content_hash, kind, **key_options)
+    cached_path = RESULT_CACHE.get(cache_key)
+    if cached_path:
+        os.remove(upload.path)
+    return Conversion(
+        upload.filename,
+        download_name,
+        upload.path,
+        os.path.join(folder, download_name),
+        cache_key,
+        ext,
+        convert,
+        args,
+        cached_path,
+    )
+
 
+def excel_conversion(upload: ReceivedUpload, pages: Optional[str]) -> Conversion:
+    return plan_conversion(
+        upload,
+        EXCEL_DOWNLOAD_FOLDER,
+        ".xlsx",
+        "excel",
+        convert_pdf_tables_to_excel,
+        (pages,),
+        pages=pages,
+    )
 
-@router.post("/to-word")
-async def pdf_to_word(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".pdf"):
-        return {"error": "Please upload a PDF file."}
 
-    pdf_path = await save_upload_file(file, PDF_DOWNLOAD_FOLDER)
+def word_conversion(upload: ReceivedUpload, pages: Optional[str], parallel: bool) -> Conversion:
+    # Parallel parsing analyses each chunk on its own, so its layout can differ slightly.
+    return plan_conversion(
+        upload,
+        WORD_DOWNLOAD_FOLDER,
+        ".docx",
+        "word",
+        convert_pdf_to_docx,
+        (pages, parallel),
+        pages=pages,
+        parallel=parallel,
+    )
 
-    base_name = safe_stem(file.filename)
-    unique_id = uuid.uuid4().hex
-    word_filename = f"{base_name}_{unique_id}.docx"
-    word_path = os.path.join(WORD_DOWNLOAD_FOLDER, word_filename)
 
+def image_conversion(upload: ReceivedUpload, options: ImageOptions) -> Conversion:
+    # Archive entries are named after the upload, so the stem is part of the key.
+    base_name = safe_stem(upload.filename)
+    return plan_conversion(
+        upload,
+        IMAGE_DOWNLOAD_FOLDER,
+        ".zip",
+        "image",
+        create_images_zip,
+        (base_name, options),
+        base_name=base_name,
+        **options._asdict(),
+    )
+
+
+def ocr_conversion(
+    upload: ReceivedUpload, pages: Optional[str], options: OcrOptions
+) -> Conversion:
+    return plan_conversion(
+        upload,
+        OCR_DOWNLOAD_FOLDER,
+        options.ext,
+        "ocr",
+        ocr_pdf,
+        (upload.content_hash, pages, options),
+        pages=pages,
+        **options._asdict(),
+    )
+
+
+async def convert_and_cache(
+    conversion: Conversion, progress_callback: Optional[ProgressCallback] = None
+) -> str:
+    """Run a conversion on the PDF executor and move its output into the result cache."""
     try:
-        await asyncio.to_thread(convert_pdf_to_docx, pdf_path, word_path)
-    except Exception as e:
-        if os.path.exists(word_path):
-            os.remove(word_path)
-        delete_file_later(pdf_path)
-        return {"error": f"Failed to convert PDF: {str(e)}"}
+        await PDF_EXECUTOR.run(
+            conversion.convert,
+            conversion.pdf_path,
+            conversion.output_path,
+            *conversion.args,
+            progress_callback=progress_callback,
+        )
+    except Exception:
+        if os.path.exists(conversion.output_path):
+            os.remove(conversion.output_path)
+        raise
+    finally:
+        delete_file_later(conversion.pdf_path)
 
-    delete_file_later(pdf_path)
-    delete_file_later(word_path, delay=600)
+    return RESULT_CACHE.put(conversion.cache_key, conversion.output_path, conversion.ext)
 
-    safe_filename = ascii_filename(os.path.basename(word_path))
-    headers = {"Content-Disposition": f'attachment; filename="{safe_filename}"'}
-    return FileResponse(word_path, filename=safe_filename, headers=headers)
 
+def finish_conversion_job(process_id: str, conversion: Conversion) -> None:
+    """Complete a job with its own link to the cached output, kept as long as the job."""
+    file_path = RESULT_CACHE.link(conversion.cache_key, conversion.output_path)
+    if not file_path:
+        DOWNLOAD_TRACKER.update_job(
+            process_id, status="failed", error="Conversion result expired, please retry."
+        )
+        return
+    delete_file_later(file_path, delay=JOB_RETENTION)
+    DOWNLOAD_TRACKER.update_job(
+        process_id,
+        status="completed",
+        progress=100.0,
+        file_path=file_path,
+        suggested_name=conversion.download_name,
+    )
+
+
+def start_conversion_job(conversion: Conversion) -> str:
+    """Run a conversion in the background and return its process identifier."""
+    job = DOWNLOAD_TRACKER.create_job(source="pdf", url=conversion.upload_name)
+
+    if conversion.cached_path:
+        finish_conversion_job(job.process_id, conversion)
+        return job.process_id
+
+    async def runner():
+        DOWNLOAD_TRACKER.update_job(job.process_id, status="running", progress=0.0)
+        try:
+            await convert_and_cache(
+                conversion, progress_callback=job_progress(job.process_id)
+            )
+        except Exception as exc:
+            DOWNLOAD_TRACKER.update_job(
+                job.process_id, status="failed", error=conversion_error(exc)
+            )
+            return
 
-@router.post("/to-image")
-async def pdf_to_image(file: UploadFile = File(...)):
-    if not file.filename.lower().endswith(".pdf"):
-        return {"error": "Please upload a PDF file."}
+        finish_conversion_job(job.process_id, conversion)
 
-    pdf_path = await save_upload_file(file, PDF_DOWNLOAD_FOLDER)
+    asyncio.create_task(runner())
+    return job.process_id
 
-    base_name = safe_stem(file.filename)
-    unique_id = uuid.uuid4().hex
-    session_folder = os.path.join(IMAGE_DOWNLOAD_FOLDER, f"{base_name}_{unique_id}")
-    os.makedirs(session_folder, exist_ok=True)
-    zip_path = os.path.join(IMAGE_DOWNLOAD_FOLDER, f"{base_name}_{unique_id}.zip")
 
+async def start_batch(
+    request: Request, plan: Callable[[ReceivedUpload], Conversion]
+) -> Dict[str, object]:
+    """Receive every PDF of the request and convert each one as a background job."""
     try:
-        await asyncio.to_thread(
-            create_images_zip, pdf_path, session_folder, zip_path, base_name
+        uploads = await receive_pdf_uploads(request, PDF_DOWNLOAD_FOLDER, PDF_BATCH_MAX_FILES)
+    except UploadRejected as e:
+        return {"error": str(e)}
+
+    process_ids = [start_conversion_job(plan(upload)) for upload in uploads]
+    batch = DOWNLOAD_TRACKER.create_batch("pdf", process_ids)
+    return {"batch_id": batch.batch_id, "process_ids": process_ids}
+
+
+async def page_image_response(
+    document_id: str, page_number: int, options: ImageOptions
+) -> Response:
+    """Render (or fetch from cache) one page of an uploaded document."""
+    try:
+        data = await PDF_EXECUTOR.run(
+            PAGE_RENDERER.render, document_id, page_number, options
         )
+    except DocumentNotFound:
+        raise HTTPException(status_code=404, detail="Document not found")
     except ValueError as e:
-        shutil.rmtree(session_folder, ignore_errors=True)
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
-        delete_file_later(pdf_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    # A document id is the hash of its content, so a rendered page never changes.
+    headers = {"Cache-Control": f"private, max-age={PDF_DOCUMENT_TTL}, immutable"}
+    return Response(content=data, media_type=options.media_type, headers=headers)
+
+
+@router.get("/cache/stats")
+async def get_result_cache_stats():
+    return {**RESULT_CACHE.stats(), "page_renderer": PAGE_RENDERER.stats()}
+
+
+@router.post("/documents", openapi_extra=pdf_upload_openapi())
+async def upload_document(request: Request):
+    """Keep a PDF for page rendering; its id is the SHA-256 of its content."""
+    try:
+        upload = await receive_pdf_upload(request, PDF_DOWNLOAD_FOLDER)
+    except UploadRejected as e:
         return {"error": str(e)}
+
+    document_id = upload.content_hash
+    document_path = PAGE_RENDERER.document_path(document_id)
+    os.replace(upload.path, document_path)
+    try:
+        page_count = await PDF_EXECUTOR.run(PAGE_RENDERER.page_count, document_id)
     except Exception as e:
-        shutil.rmtree(session_folder, ignore_errors=True)
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
-        delete_file_later(pdf_path)
-        return {"error": f"Failed to convert PDF: {str(e)}"}
+        PAGE_RENDERER.forget(document_id)
+        os.remove(document_path)
+        return {"error": conversion_error(e)}
 
-    shutil.rmtree(session_folder, ignore_errors=True)
-    delete_file_later(pdf_path)
-    delete_file_later(zip_path, delay=600)
+    delete_file_later(document_path, delay=PDF_DOCUMENT_TTL)
+    return {
+        "document_id": document_id,
+        "filename": upload.filename,
+        "page_count": page_count,
+        "expires_in": PDF_DOCUMENT_TTL,
+    }
 
-    safe_filename = ascii_filename(os.path.basename(zip_path))
-    headers = {"Content-Disposition": f'attachment; filename="{safe_filename}"'}
-    return FileResponse(zip_path, filename=safe_filename, headers=headers)
+
+@router.get("/documents/{document_id}/pages/{page_number}")
+async def render_document_page(
+    document_id: str,
+    page_number: int = Path(..., ge=1),
+    options: ImageOptions = Depends(image_query(PDF_PAGE_DEFAULT_DPI)),
+):
+    return await page_image_response(document_id, page_number, options)
+
+
+@router.get("/documents/{document_id}/thumbnail")
+async def render_document_thumbnail(
+    document_id: str,
+    page: int = Query(1, ge=1),
+    format: Literal["png", "jpeg", "webp"] = "png",
+):
+    try:
+        options = ImageOptions(format, PDF_THUMBNAIL_DPI).validate()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await page_image_response(document_id, page, options)
+
+
+@router.post("/to-excel", openapi_extra=pdf_upload_openapi())
+async def pdf_to_excel(
+    request: Request,
+    pages: Optional[str] = Query(None, description='1-based page range such as "1-3,7"'),
+    background: bool = False,
+):
+    try:
+        upload = await receive_pdf_upload(request, PDF_DOWNLOAD_FOLDER)
+    except UploadRejected as e:
+        return {"error": str(e)}
+
+    conversion = excel_conversion(upload, pages)
+    if background:
+        return {"process_id": start_conversion_job(conversion)}
+
+    cached_path = conversion.cached_path
+    if not cached_path:
+        try:
+            cached_path = await convert_and_cache(conversion)
+        except Exception as e:
+            return {"error": conversion_error(e)}
+
+    return attachment_response(cached_path, conversion.download_name)
+
+
+@router.post("/to-word", openapi_extra=pdf_upload_openapi())
+async def pdf_to_word(
+    request: Request,
+    pages: Optional[str] = Query(None, description='1-based page range such as "1-3,7"'),
+    parallel: bool = Query(False, description="Parse page chunks in worker processes"),
+    background: bool = False,
+):
+    try:
+        upload = await receive_pdf_upload(request, PDF_DOWNLOAD_FOLDER)
+    except UploadRejected as e:
+        return {"error": str(e)}
+
+    conversion = word_conversion(upload, pages, parallel)
+    if background:
+        return {"process_id": start_conversion_job(conversion)}
+
+    cached_path = conversion.cached_path
+    if not cached_path:
+        try:
+            cached_path = await convert_and_cache(conversion)
+        except Exception as e:
+            return {"error": conversion_error(e)}
+
+    return attachment_response(cached_path, conversion.download_name)
+
+
+@router.post("/to-image", openapi_extra=pdf_upload_openapi())
+async def pdf_to_image(
+    request: Request,
+    stream: bool = False,
+    background: bool = False,
+    compress: bool = Query(False, description="Deflate archive entries"),
+    options: ImageOptions = Depends(image_query(72)),
+):
+    try:
+        upload = await receive_pdf_upload(request, PDF_DOWNLOAD_FOLDER)
+    except UploadRejected as e:
+        return {"error": str(e)}
+
+    conversion = image_conversion(upload, options._replace(compress=compress))
+    if background:
+        return {"process_id": start_conversion_job(conversion)}
+
+    if conversion.cached_path:
+        return image_archive_response(conversion.cached_path, conversion.download_name)
+
+    if stream:
+        # Pages are rendered in memory and sent as zip entries while the rest render.
+        try:
+            chunks = await PDF_EXECUTOR.run(
+                open_images_zip_stream, conversion.pdf_path, *conversion.args
+            )
+        except Exception as e:
+            return {"error": conversion_error(e)}
+        finally:
+            delete_file_later(conversion.pdf_path)
+
+        safe_filename = ascii_filename(conversion.download_name)
+        headers = {"Content-Disposition": f'attachment; filename="{safe_filename}"'}
+        return StreamingResponse(
+            PDF_EXECUTOR.iterate(
+                tee_to_cache(chunks, conversion.cache_key, conversion.output_path)
+            ),
+            media_type="application/zip",
+            headers=headers,
+        )
+
+    try:
+        cached_path = await convert_and_cache(conversion)
+    except Exception as e:
+        return {"error": conversion_error(e)}
+
+    return image_archive_response(cached_path, conversion.download_name)
+
+
+@router.post("/ocr", openapi_extra=pdf_upload_openapi())
+async def pdf_ocr(
+    request: Request,
+    pages: Optional[str] = Query(None, description='1-based page range such as "1-3,7"'),
+    background: bool = False,
+    options: OcrOptions = Depends(ocr_query),
+):
+    """Recognize scanned pages; pages that already have text are not recognized again."""
+    try:
+        upload = await receive_pdf_upload(request, PDF_DOWNLOAD_FOLDER)
+    except UploadRejected as e:
+        return {"error": str(e)}
+
+    conversion = ocr_conversion(upload, pages, options)
+    if background:
+        return {"process_id": start_conversion_job(conversion)}
+
+    cached_path = conversion.cached_path
+    if not cached_path:
+        try:
+            cached_path = await convert_and_cache(conversion)
+        except Exception as e:
+            return {"error": conversion_error(e)}
+
+    return attachment_response(cached_path, conversion.download_name)
+
+
+@router.post("/batch/to-excel", openapi_extra=pdf_upload_openapi("files", multiple=True))
+async def pdf_batch_to_excel(
+    request: Request,
+    pages: Optional[str] = Query(None, description='1-based page range such as "1-3,7"'),
+):
+    """Convert several PDFs in the background; returns a batch id and process ids."""
+    return await start_batch(request, lambda upload: excel_conversion(upload, pages))
+
+
+@router.post("/batch/to-word", openapi_extra=pdf_upload_openapi("files", multiple=True))
+async def pdf_batch_to_word(
+    request: Request,
+    pages: Optional[str] = Query(None, description='1-based page range such as "1-3,7"'),
+    parallel: bool = Query(False, description="Parse page chunks in worker processes"),
+):
+    """Convert several PDFs in the background; returns a batch id and process ids."""
+    return await start_batch(request, lambda upload: word_conversion(upload, pages, parallel))
+
+
+@router.post("/batch/to-image", openapi_extra=pdf_upload_openapi("files", multiple=True))
+async def pdf_batch_to_image(
+    request: Request,
+    compress: bool = Query(False, description="Deflate archive entries"),
+    options: ImageOptions = Depends(image_query(72)),
+):
+    """Convert several PDFs in the background; returns a batch id and process ids."""
+    options = options._replace(compress=compress)
+    return await start_batch(request, lambda upload: image_conversion(upload, options))
+
+
+@router.post("/batch/ocr", openapi_extra=pdf_upload_openapi("files", multiple=True))
+async def pdf_batch_ocr(
+    request: Request,
+    pages: Optional[str] = Query(None, description='1-based page range such as "1-3,7"'),
+    options: OcrOptions = Depends(ocr_query),
+):
+    """Recognize several PDFs in the background; returns a batch id and process ids."""
+    return await start_batch(request, lambda upload: ocr_conversion(upload, pages, options))
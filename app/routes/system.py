@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.executors import executor_stats
+from app.services.metrics import CONTENT_TYPE, METRICS
+
+router = APIRouter(tags=["System"])
+
+
+@router.get("/system/executors")
+async def get_executor_stats():
+    """Queue depth, utilization and busy time of each worker pool."""
+    return executor_stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint: stage timings, throughput and service gauges."""
+    return PlainTextResponse(METRICS.render(), media_type=CONTENT_TYPE)
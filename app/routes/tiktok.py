@@ -1,72 +1,101 @@
-import asyncio
 import os
+from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, HTTPException
 
-from app.config import DOWNLOAD_FOLDER
-from app.downloaders.common import download_video
+from app.config import BATCH_MAX_URLS, DOWNLOAD_FOLDER
+from app.downloaders.common import (
+    download_video,
+    extract_video_info,
+    summarize_video_info,
+)
 from app.services.download_tracker import DOWNLOAD_TRACKER
+from app.services.executors import DOWNLOAD_EXECUTOR
+from app.services.job_scheduler import JOB_SCHEDULER, QueueFullError, submit_batch
+from app.services.progress import ProgressReporter
 from app.utils.file_ops import delete_file_later
 
 router = APIRouter(prefix="/tiktok", tags=["TikTok"])
 
+OUTPUT_TEMPLATE = os.path.join(
+    DOWNLOAD_FOLDER, "tiktok_%(id)s_%(upload_date)s_%(timestamp)s.%(ext)s"
+)
+CUSTOM_OPTIONS = {
+    "retries": 5,
+    "fragment_retries": 5,
+    "skip_unavailable_fragments": True,
+}
 
-@router.post("/download")
-async def request_tiktok_download(url: str):
-    """Kick off a TikTok download and return a process identifier."""
-    job = DOWNLOAD_TRACKER.create_job(source="tiktok", url=url)
 
-    output_template = os.path.join(
-        DOWNLOAD_FOLDER, "tiktok_%(id)s_%(upload_date)s_%(timestamp)s.%(ext)s"
+def submit_tiktok_download(url: str) -> str:
+    """Create (or share) a TikTok download job and admit it; return its process id."""
+    process_id, created = DOWNLOAD_TRACKER.create_or_attach(
+        source="tiktok", url=url, options=CUSTOM_OPTIONS
     )
-    custom_options = {
-        "retries": 5,
-        "fragment_retries": 5,
-        "skip_unavailable_fragments": True,
-    }
+    if not created:
+        return process_id
 
     async def runner():
-        DOWNLOAD_TRACKER.update_job(job.process_id, status="running", progress=0.0)
-
-        def hook(data):
-            status = data.get("status")
-            if status == "downloading":
-                downloaded = int(data.get("downloaded_bytes") or 0)
-                total = data.get("total_bytes") or data.get("total_bytes_estimate")
-                progress = (
-                    (downloaded / total) * 100 if total and total > 0 else 0.0
-                )
-                DOWNLOAD_TRACKER.update_job(
-                    job.process_id,
-                    bytes_downloaded=downloaded,
-                    total_bytes=int(total) if total else None,
-                    progress=progress,
-                )
-            elif status == "finished":
-                DOWNLOAD_TRACKER.update_job(job.process_id, progress=100.0)
+        reporter = ProgressReporter(process_id)
+        reporter.start()
 
         try:
-            filename = await asyncio.to_thread(
+            filename = await DOWNLOAD_EXECUTOR.run(
                 download_video,
                 url,
-                output_template,
-                custom_options,
-                hook,
+                OUTPUT_TEMPLATE,
+                CUSTOM_OPTIONS,
+                reporter.ytdlp_hook,
             )
         except Exception as exc:
-            DOWNLOAD_TRACKER.update_job(
-                job.process_id, status="failed", error=str(exc)
-            )
+            reporter.fail(str(exc))
             return
 
-        DOWNLOAD_TRACKER.update_job(
-            job.process_id,
-            status="completed",
-            progress=100.0,
-            file_path=filename,
-            suggested_name=os.path.basename(filename),
-        )
+        reporter.complete(filename, os.path.basename(filename))
         delete_file_later(filename, delay=600)
 
-    asyncio.create_task(runner())
-    return {"process_id": job.process_id}
+    try:
+        JOB_SCHEDULER.submit("tiktok", process_id, runner)
+    except QueueFullError:
+        DOWNLOAD_TRACKER.discard_job(process_id)
+        raise
+    return process_id
+
+
+@router.post("/download")
+async def request_tiktok_download(url: str):
+    """Kick off a TikTok download and return a process identifier."""
+    try:
+        process_id = submit_tiktok_download(url)
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return {"process_id": process_id}
+
+
+@router.post("/download/batch")
+async def request_tiktok_batch(
+    urls: List[str] = Body(..., embed=True, min_length=1, max_length=BATCH_MAX_URLS),
+):
+    """Kick off many TikTok downloads and return a batch id with their process ids."""
+    try:
+        return submit_batch("tiktok", urls, submit_tiktok_download)
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+
+@router.get("/info")
+async def get_tiktok_info(url: str):
+    """Return title, duration, formats and estimated size without downloading."""
+    try:
+        info = await DOWNLOAD_EXECUTOR.run(extract_video_info, url)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Failed to extract video info: {exc}")
+    return summarize_video_info(info)
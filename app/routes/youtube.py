@@ -1,25 +1,71 @@
-import asyncio
+from typing import List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, HTTPException
 
+from app.config import BATCH_MAX_URLS
+from app.downloaders.common import extract_video_info, summarize_video_info
 from app.downloaders.youtube import YOUTUBE_DOWNLOADER
 from app.services.download_tracker import DOWNLOAD_TRACKER
+from app.services.executors import DOWNLOAD_EXECUTOR
+from app.services.job_scheduler import JOB_SCHEDULER, QueueFullError, submit_batch
 
 router = APIRouter(prefix="/youtube", tags=["YouTube"])
 
 
-@router.post("/download")
-async def request_youtube_download(url: str):
-    """Kick off a YouTube download and return a process identifier."""
-    job = DOWNLOAD_TRACKER.create_job(source="youtube", url=url)
+def submit_youtube_download(url: str) -> str:
+    """Create (or share) a YouTube download job and admit it; return its process id."""
+    process_id, created = DOWNLOAD_TRACKER.create_or_attach(source="youtube", url=url)
+    if not created:
+        return process_id
 
     async def runner():
         try:
-            await YOUTUBE_DOWNLOADER.download(url, job.process_id)
+            await YOUTUBE_DOWNLOADER.download(url, process_id)
         except Exception as exc:
-            DOWNLOAD_TRACKER.update_job(
-                job.process_id, status="failed", error=str(exc)
-            )
+            DOWNLOAD_TRACKER.update_job(process_id, status="failed", error=str(exc))
+
+    try:
+        JOB_SCHEDULER.submit("youtube", process_id, runner)
+    except QueueFullError:
+        DOWNLOAD_TRACKER.discard_job(process_id)
+        raise
+    return process_id
+
+
+@router.post("/download")
+async def request_youtube_download(url: str):
+    """Kick off a YouTube download and return a process identifier."""
+    try:
+        process_id = submit_youtube_download(url)
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+    return {"process_id": process_id}
+
+
+@router.post("/download/batch")
+async def request_youtube_batch(
+    urls: List[str] = Body(..., embed=True, min_length=1, max_length=BATCH_MAX_URLS),
+):
+    """Kick off many YouTube downloads and return a batch id with their process ids."""
+    try:
+        return submit_batch("youtube", urls, submit_youtube_download)
+    except QueueFullError as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
 
-    asyncio.create_task(runner())
-    return {"process_id": job.process_id}
+@router.get("/info")
+async def get_youtube_info(url: str):
+    """Return title, duration, formats and estimated size without downloading."""
+    try:
+        info = await DOWNLOAD_EXECUTOR.run(extract_video_info, url)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Failed to extract video info: {exc}")
+    return summarize_video_info(info)
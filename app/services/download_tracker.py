@@ -1,62 +1,455 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
 import threading
+import time
 import uuid
-from dataclasses import dataclass, asdict
-from typing import Dict, Optional
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
+from app.config import (
+    JOB_MAX_FINISHED,
+    JOB_MIN_AGE,
+    JOB_RETENTION,
+    SHARED_FILE_MAX_HOLD,
+)
+from app.services.janitor import FILE_JANITOR
+from app.services.job_store import JobStore, MemoryJobStore, build_job_store
+from app.services.metrics import METRICS
+from app.utils.url_ops import normalize_media_url
 
-@dataclass
+TERMINAL_STATUSES = frozenset({"completed", "failed"})
+
+
+@dataclass(slots=True)
 class DownloadJob:
     process_id: str
     source: str
     url: str
     status: str = "pending"
+    queue_position: Optional[int] = None
     progress: float = 0.0
     bytes_downloaded: int = 0
     total_bytes: Optional[int] = None
+    speed: Optional[float] = None
+    eta: Optional[float] = None
+    pages_processed: int = 0
+    total_pages: Optional[int] = None
     file_path: Optional[str] = None
+    partial_path: Optional[str] = None
     suggested_name: Optional[str] = None
     error: Optional[str] = None
+    finished_at: Optional[float] = None
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass(slots=True)
+class DownloadBatch:
+    batch_id: str
+    kind: str
+    process_ids: List[str]
+    created_at: float = field(default_factory=time.time)
+
+
+class JobWatcher:
+    """Wakes an asyncio consumer whenever one of the jobs it watches changes."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        # Updates arrive from worker threads (yt-dlp hooks), so hop onto the loop.
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a change; return False if the timeout passed without one."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._event.clear()
+        return True
 
 
 class DownloadTracker:
-    def __init__(self) -> None:
+    """Job table for this process, written through to a pluggable JobStore.
+
+    Jobs started here live in memory; jobs owned by other workers, or by an
+    earlier run, are read from the store and cannot be updated from here.
+    Finished jobs are evicted from memory ``retention`` seconds after they end,
+    or sooner once more than ``max_finished`` of them are kept; the cap only
+    takes jobs that finished ``min_age`` seconds ago and hold no awaited file.
+    """
+
+    def __init__(
+        self,
+        store: Optional[JobStore] = None,
+        retention: float = JOB_RETENTION,
+        max_finished: int = JOB_MAX_FINISHED,
+        min_age: float = JOB_MIN_AGE,
+    ) -> None:
+        self.store = store or MemoryJobStore()
+        self.retention = retention
+        self.max_finished = max_finished
+        self.min_age = min_age
         self._jobs: Dict[str, DownloadJob] = {}
+        # Secondary indexes for listings, and finished jobs in eviction order.
+        self._by_status: Dict[str, Set[str]] = {}
+        self._by_source: Dict[str, Set[str]] = {}
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._watchers: Dict[str, Set[JobWatcher]] = {}
+        # Single-flight bookkeeping: alias id -> shared job id, dedup key -> job id,
+        # consumers still expected to fetch a shared file, and how long it is held.
+        self._aliases: Dict[str, str] = {}
+        self._by_key: Dict[str, str] = {}
+        self._job_keys: Dict[str, str] = {}
+        self._consumers: Dict[str, Set[str]] = {}
+        self._hold_until: Dict[str, float] = {}
+        self._by_file: Dict[str, str] = {}
+        self._job_aliases: Dict[str, List[str]] = {}
+        self._batches: "OrderedDict[str, DownloadBatch]" = OrderedDict()
         self._lock = threading.Lock()
 
+    def _add_locked(self, job: DownloadJob) -> None:
+        self._jobs[job.process_id] = job
+        self._by_status.setdefault(job.status, set()).add(job.process_id)
+        self._by_source.setdefault(job.source, set()).add(job.process_id)
+
+    @staticmethod
+    def _unindex(index: Dict[str, Set[str]], value: str, process_id: str) -> None:
+        members = index.get(value)
+        if members is not None:
+            members.discard(process_id)
+            if not members:
+                del index[value]
+
+    def _forget_locked(self, process_id: str) -> None:
+        """Drop a job and every piece of bookkeeping that refers to it."""
+        job = self._jobs.pop(process_id, None)
+        if job is None:
+            return
+        self._unindex(self._by_status, job.status, process_id)
+        self._unindex(self._by_source, job.source, process_id)
+        self._finished.pop(process_id, None)
+        self._consumers.pop(process_id, None)
+        self._hold_until.pop(process_id, None)
+        for alias_id in self._job_aliases.pop(process_id, ()):
+            self._aliases.pop(alias_id, None)
+        if job.file_path and self._by_file.get(job.file_path) == process_id:
+            del self._by_file[job.file_path]
+        key = self._job_keys.pop(process_id, None)
+        if key and self._by_key.get(key) == process_id:
+            del self._by_key[key]
+
+    def _holds_file_locked(self, process_id: str, now: float) -> bool:
+        """Whether a shared job's file is still awaited by one of its consumers."""
+        if process_id not in self._hold_until or not self._consumers.get(process_id):
+            return False
+        return now < self._hold_until[process_id]
+
+    def _evict_locked(self) -> None:
+        """Forget finished jobs past their retention, then trim to the cap, oldest first."""
+        now = time.time()
+        expired = now - self.retention
+        while self._finished:
+            process_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > expired:
+                break
+            self._forget_locked(process_id)
+
+        excess = len(self._finished) - self.max_finished
+        if excess <= 0:
+            return
+        settled = now - self.min_age
+        for process_id, finished_at in list(self._finished.items()):
+            if excess <= 0 or finished_at > settled:
+                return
+            if self._holds_file_locked(process_id, now):
+                continue
+            self._forget_locked(process_id)
+            excess -= 1
+
+    def _batch_active_locked(self, batch: DownloadBatch) -> bool:
+        for process_id in batch.process_ids:
+            job = self._jobs.get(self._resolve(process_id))
+            if job is not None and job.status not in TERMINAL_STATUSES:
+                return True
+        return False
+
+    def _evict_batches_locked(self) -> None:
+        """Forget batches past the retention once none of their jobs is still active."""
+        expired = time.time() - self.retention
+        for batch in list(self._batches.values()):
+            if batch.created_at > expired:
+                return
+            if not self._batch_active_locked(batch):
+                del self._batches[batch.batch_id]
+
     def create_job(self, source: str, url: str) -> DownloadJob:
         process_id = uuid.uuid4().hex
         job = DownloadJob(process_id=process_id, source=source, url=url)
         with self._lock:
-            self._jobs[process_id] = job
+            self._add_locked(job)
+        self.store.save(asdict(job), immediate=True)
         return job
 
+    @staticmethod
+    def dedup_key(source: str, url: str, options: Optional[Dict] = None) -> str:
+        encoded_options = json.dumps(options or {}, sort_keys=True, default=str)
+        return f"{source}|{normalize_media_url(url)}|{encoded_options}"
+
+    def create_or_attach(
+        self, source: str, url: str, options: Optional[Dict] = None
+    ) -> Tuple[str, bool]:
+        """Return (process_id, created); identical in-flight or finished jobs are shared.
+
+        When an equivalent job is running, or completed and its file is still on
+        disk, the caller gets an alias process id that reads that job instead of
+        starting a second download.
+        """
+        key = self.dedup_key(source, url, options)
+        with self._lock:
+            shared_id = self._by_key.get(key)
+            shared = self._jobs.get(shared_id) if shared_id else None
+            reusable = shared is not None and (
+                shared.status not in TERMINAL_STATUSES
+                or (
+                    shared.status == "completed"
+                    and shared.file_path
+                    and os.path.exists(shared.file_path)
+                )
+            )
+            if reusable:
+                alias_id = uuid.uuid4().hex
+                self._aliases[alias_id] = shared_id
+                self._job_aliases.setdefault(shared_id, []).append(alias_id)
+                self._consumers.setdefault(shared_id, set()).add(alias_id)
+                # Only shared jobs hold their file; the clock starts at completion.
+                self._hold_until[shared_id] = (
+                    time.time() + SHARED_FILE_MAX_HOLD
+                    if shared.status == "completed"
+                    else float("inf")
+                )
+            else:
+                process_id = uuid.uuid4().hex
+                job = DownloadJob(process_id=process_id, source=source, url=url)
+                self._add_locked(job)
+                self._by_key[key] = process_id
+                self._job_keys[process_id] = key
+                self._consumers[process_id] = {process_id}
+                row = asdict(job)
+
+        if reusable:
+            self.store.save_alias(alias_id, shared_id)
+            return alias_id, False
+        self.store.save(row, immediate=True)
+        return process_id, True
+
+    def create_batch(self, kind: str, process_ids: List[str]) -> DownloadBatch:
+        """Group jobs that were submitted together under one batch id."""
+        batch = DownloadBatch(batch_id=uuid.uuid4().hex, kind=kind, process_ids=list(process_ids))
+        with self._lock:
+            self._evict_batches_locked()
+            self._batches[batch.batch_id] = batch
+        self.store.save_batch(asdict(batch))
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[DownloadBatch]:
+        with self._lock:
+            batch = self._batches.get(batch_id)
+        if batch is not None:
+            return batch
+        row = self.store.load_batch(batch_id)
+        return DownloadBatch(**row) if row else None
+
+    def discard_job(self, process_id: str) -> None:
+        """Forget a job that was never admitted, including its dedup entries."""
+        with self._lock:
+            self._forget_locked(process_id)
+        self.store.delete(process_id)
+
+    def _resolve(self, process_id: str) -> str:
+        return self._aliases.get(process_id, process_id)
+
+    def is_local(self, process_id: str) -> bool:
+        """Whether this process runs the job, so watchers are notified of changes."""
+        with self._lock:
+            return self._resolve(process_id) in self._jobs
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of jobs this process holds, per status."""
+        with self._lock:
+            counts = {status: len(ids) for status, ids in self._by_status.items()}
+        counts["active"] = counts.get("pending", 0) + counts.get("running", 0)
+        return counts
+
     def get_job(self, process_id: str) -> Optional[DownloadJob]:
         with self._lock:
-            return self._jobs.get(process_id)
+            job = self._jobs.get(self._resolve(process_id))
+        if job is not None:
+            return job
+        row = self.store.load(process_id)
+        return DownloadJob(**row) if row else None
 
     def update_job(self, process_id: str, **updates) -> None:
         with self._lock:
             job = self._jobs.get(process_id)
             if not job:
                 return
+            previous_status = job.status
             for key, value in updates.items():
                 if hasattr(job, key):
                     setattr(job, key, value)
+            if job.status != previous_status:
+                self._unindex(self._by_status, previous_status, process_id)
+                self._by_status.setdefault(job.status, set()).add(process_id)
+            self._after_update(job, updates)
+            row = asdict(job)
+            watchers = list(self._watchers.get(process_id, ()))
+        # Status changes are written through at once; progress is batched.
+        self.store.save(row, immediate="status" in updates)
+        for watcher in watchers:
+            watcher.notify()
 
-    def serialize_job(self, process_id: str) -> Optional[Dict[str, object]]:
+    def _after_update(self, job: DownloadJob, updates: Dict[str, object]) -> None:
+        status = updates.get("status")
+        if status in TERMINAL_STATUSES and job.finished_at is None:
+            job.finished_at = time.time()
+            self._finished[job.process_id] = job.finished_at
+            self._evict_locked()
+        if status == "failed":
+            # A failed job must not capture later requests for the same URL.
+            key = self._job_keys.pop(job.process_id, None)
+            if key and self._by_key.get(key) == job.process_id:
+                del self._by_key[key]
+        if status == "completed" and job.process_id in self._hold_until:
+            self._hold_until[job.process_id] = time.time() + SHARED_FILE_MAX_HOLD
+        if updates.get("file_path"):
+            self._by_file[job.file_path] = job.process_id
+
+    def release_consumer(self, process_id: str) -> None:
+        """Mark that a consumer of a shared download has fetched its file."""
         with self._lock:
-            job = self._jobs.get(process_id)
-            if not job:
-                return None
-            payload = asdict(job)
+            shared_id = self._resolve(process_id)
+            consumers = self._consumers.get(shared_id)
+            if consumers is not None:
+                consumers.discard(process_id)
+
+    def file_in_use(self, file_path: str) -> bool:
+        """Janitor guard: keep shared files until every consumer fetched them."""
+        with self._lock:
+            process_id = self._by_file.get(file_path)
+            return process_id is not None and self._holds_file_locked(process_id, time.time())
+
+    def watch(self, process_ids: Iterable[str], watcher: JobWatcher) -> None:
+        with self._lock:
+            for process_id in process_ids:
+                process_id = self._resolve(process_id)
+                self._watchers.setdefault(process_id, set()).add(watcher)
+
+    def unwatch(self, process_ids: Iterable[str], watcher: JobWatcher) -> None:
+        with self._lock:
+            for process_id in process_ids:
+                process_id = self._resolve(process_id)
+                watchers = self._watchers.get(process_id)
+                if watchers:
+                    watchers.discard(watcher)
+                    if not watchers:
+                        del self._watchers[process_id]
+
+    @staticmethod
+    def _with_file_state(payload: Dict[str, object]) -> Dict[str, object]:
         if payload.get("file_path"):
             payload["file_exists"] = os.path.exists(payload["file_path"])
         else:
             payload["file_exists"] = False
         return payload
 
+    @staticmethod
+    def _as_alias(payload: Dict[str, object], process_id: str) -> Dict[str, object]:
+        if payload["process_id"] != process_id:
+            payload["alias_of"] = payload["process_id"]
+            payload["process_id"] = process_id
+        return payload
+
+    def _payload(self, process_id: str) -> Optional[Dict[str, object]]:
+        job = self._jobs.get(self._resolve(process_id))
+        if not job:
+            return None
+        return self._as_alias(asdict(job), process_id)
+
+    def _stored_payload(self, process_id: str) -> Optional[Dict[str, object]]:
+        row = self.store.load(process_id)
+        return self._as_alias(row, process_id) if row else None
+
+    def serialize_job(self, process_id: str) -> Optional[Dict[str, object]]:
+        with self._lock:
+            payload = self._payload(process_id)
+        if not payload:
+            payload = self._stored_payload(process_id)
+        if not payload:
+            return None
+        return self._with_file_state(payload)
+
+    def serialize_jobs(
+        self, process_ids: Iterable[str]
+    ) -> Dict[str, Optional[Dict[str, object]]]:
+        """Serialize several jobs under a single lock acquisition."""
+        payloads: Dict[str, Optional[Dict[str, object]]] = {}
+        with self._lock:
+            for process_id in process_ids:
+                payloads[process_id] = self._payload(process_id)
+        for process_id, payload in payloads.items():
+            if payload is None:
+                payloads[process_id] = self._stored_payload(process_id)
+        return {
+            process_id: self._with_file_state(payload) if payload else None
+            for process_id, payload in payloads.items()
+        }
+
+    def list_jobs(
+        self,
+        status: Optional[str] = None,
+        source: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> Tuple[int, List[Dict[str, object]]]:
+        """Return (total, page) of jobs matching the filters, newest first."""
+        if self.store.shared:
+            self.store.flush()
+            total, rows = self.store.list_jobs(status, source, offset, limit)
+            return total, [self._with_file_state(row) for row in rows]
+
+        with self._lock:
+            self._evict_locked()
+            filters = [
+                index.get(value, set())
+                for index, value in ((self._by_status, status), (self._by_source, source))
+                if value
+            ]
+            if filters:
+                matches = set.intersection(*sorted(filters, key=len))
+            else:
+                matches = self._jobs.keys()
+            jobs = sorted(
+                (self._jobs[process_id] for process_id in matches),
+                key=lambda job: job.created_at,
+                reverse=True,
+            )
+            page = [asdict(job) for job in jobs[offset : offset + limit]]
+        return len(jobs), [self._with_file_state(payload) for payload in page]
+
+    def close(self) -> None:
+        self.store.close()
+
 
-DOWNLOAD_TRACKER = DownloadTracker()
+DOWNLOAD_TRACKER = DownloadTracker(build_job_store())
+FILE_JANITOR.add_guard(DOWNLOAD_TRACKER.file_in_use)
+METRICS.add_stats("download_jobs", DOWNLOAD_TRACKER.status_counts)
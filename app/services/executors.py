@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from app.config import DOWNLOAD_THREADS, PDF_PROCESS_WORKERS, PDF_THREADS
+from app.services.metrics import METRICS
+
+ProgressCallback = Callable[[int, int], None]
+
+# Set in each process-pool worker by the initializer; carries busy time and
+# progress reports back to the parent.
+_relay_queue: Optional["multiprocessing.Queue"] = None
+
+_BUSY = "busy"
+_PROGRESS = "progress"
+
+
+def _init_process_worker(queue: "multiprocessing.Queue") -> None:
+    global _relay_queue
+    _relay_queue = queue
+
+
+class RelayedProgress:
+    """Picklable progress callback that forwards reports from a worker process."""
+
+    def __init__(self, task_id: int) -> None:
+        self.task_id = task_id
+
+    def __call__(self, done: int, total: int) -> None:
+        if _relay_queue is not None:
+            _relay_queue.put((_PROGRESS, self.task_id, done, total))
+
+
+def _run_in_process(
+    task_id: Optional[int], fn: Callable[..., Any], args: tuple, kwargs: dict
+) -> Any:
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # Queued after the task's progress reports, so it also ends their relay.
+        if _relay_queue is not None:
+            _relay_queue.put((_BUSY, task_id, time.perf_counter() - started, None))
+
+
+class InstrumentedExecutor:
+    """A dedicated thread or process pool that reports its load.
+
+    ``queued`` is how many submitted tasks are waiting for a worker and
+    ``utilization`` the share of workers busy right now; ``busy_seconds`` adds
+    up the time workers spent running tasks.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int) -> None:
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._task_ids = itertools.count(1)
+        self._progress: Dict[int, ProgressCallback] = {}
+        self._relay: Optional["multiprocessing.Queue"] = None
+        self._listener: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> Executor:
+        with self._lock:
+            if self._executor is not None:
+                return self._executor
+            if self.kind == "process":
+                # Spawned workers do not inherit the server's threads and locks.
+                context = multiprocessing.get_context("spawn")
+                if self._relay is None:
+                    self._relay = context.Queue()
+                    self._listener = threading.Thread(
+                        target=self._listen,
+                        args=(self._relay,),
+                        name=f"{self.name}-relay",
+                        daemon=True,
+                    )
+                    self._listener.start()
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_process_worker,
+                    initargs=(self._relay,),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+            return self._executor
+
+    def _discard(self, executor: Executor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _listen(self, relay: "multiprocessing.Queue") -> None:
+        while True:
+            message = relay.get()
+            if message is None:
+                return
+            kind, task_id, value, total = message
+            if kind == _BUSY:
+                with self._lock:
+                    self._busy_seconds += value
+                if task_id is not None:
+                    self._progress.pop(task_id, None)
+                continue
+            callback = self._progress.get(task_id)
+            if callback is not None:
+                callback(value, total)
+
+    def _run_in_thread(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._busy_seconds += time.perf_counter() - started
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *args,
+        progress_callback: Optional[ProgressCallback] = None,
+        **kwargs,
+    ) -> Future:
+        """Submit fn; a progress_callback is relayed back from worker processes."""
+        executor = self._ensure_started()
+        task_id = None
+        if progress_callback is not None:
+            if self.kind == "process":
+                task_id = next(self._task_ids)
+                self._progress[task_id] = progress_callback
+                kwargs["progress_callback"] = RelayedProgress(task_id)
+            else:
+                kwargs["progress_callback"] = progress_callback
+
+        with self._lock:
+            self._in_flight += 1
+        try:
+            if self.kind == "process":
+                try:
+                    future = executor.submit(_run_in_process, task_id, fn, args, kwargs)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory); start a fresh pool.
+                    self._discard(executor)
+                    future = self._ensure_started().submit(
+                        _run_in_process, task_id, fn, args, kwargs
+                    )
+            else:
+                future = executor.submit(self._run_in_thread, fn, *args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            if task_id is not None:
+                self._progress.pop(task_id, None)
+            raise
+        future.add_done_callback(functools.partial(self._finished, task_id))
+        return future
+
+    def _finished(self, task_id: Optional[int], future: Future) -> None:
+        if task_id is not None and (
+            future.cancelled() or isinstance(future.exception(), BrokenProcessPool)
+        ):
+            # The task never reported back through the relay.
+            self._progress.pop(task_id, None)
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await fn on this pool, like ``asyncio.to_thread`` on a dedicated pool."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def iterate(self, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        """Drive a blocking iterator from this pool, one item per task."""
+        sentinel = object()
+        future: Optional[Future] = None
+        try:
+            while True:
+                future = self.submit(next, iterator, sentinel)
+                item = await asyncio.wrap_future(future)
+                if item is sentinel:
+                    return
+                yield item
+        finally:
+            if future is not None and not future.done():
+                # A cancelled await leaves next() running; close only once it returns.
+                await asyncio.wait([asyncio.wrap_future(future)])
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await self.run(close)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = min(self._in_flight, self.max_workers)
+            return {
+                "kind": self.kind,
+                "workers": self.max_workers,
+                "running": running,
+                "queued": self._in_flight - running,
+                "utilization": running / self.max_workers,
+                "completed": self._completed,
+                "failed": self._failed,
+                "busy_seconds": round(self._busy_seconds, 3),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        executor.shutdown(wait=True, cancel_futures=True)
+        if self._relay is not None:
+            self._relay.put(None)
+            self._listener.join(timeout=5)
+            self._relay = None
+
+
+# CPU-heavy PDF work (parsing, rendering, table extraction) runs in worker
+# processes; PDF jobs are driven, and their outputs written, from PDF_EXECUTOR's
+# threads; blocking download work (yt-dlp, file streaming) has its own threads.
+PDF_PROCESS_POOL = InstrumentedExecutor("pdf-cpu", "process", PDF_PROCESS_WORKERS)
+PDF_EXECUTOR = InstrumentedExecutor("pdf-io", "thread", PDF_THREADS)
+DOWNLOAD_EXECUTOR = InstrumentedExecutor("download-io", "thread", DOWNLOAD_THREADS)
+
+EXECUTORS = (PDF_PROCESS_POOL, PDF_EXECUTOR, DOWNLOAD_EXECUTOR)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {executor.name: executor.stats() for executor in EXECUTORS}
+
+
+METRICS.add_stats("executor", executor_stats, label="executor")
+
+
+def shutdown_executors() -> None:
+    for executor in EXECUTORS:
+        executor.shutdown()
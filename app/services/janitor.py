@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import glob
+import heapq
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from app.config import (
+    DOWNLOAD_FOLDER,
+    EXCEL_DOWNLOAD_FOLDER,
+    IMAGE_DOWNLOAD_FOLDER,
+    JANITOR_GUARD_RETRY,
+    JANITOR_PERSIST_INTERVAL,
+    JANITOR_SCHEDULE_PATH,
+    JANITOR_STALE_AFTER,
+    OCR_DOWNLOAD_FOLDER,
+    PDF_DOWNLOAD_FOLDER,
+    WORD_DOWNLOAD_FOLDER,
+)
+from app.services.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Uploads are stored under generated hex names; anything else in that folder
+# (such as the bundled sample PDFs) is left alone by the startup sweep.
+GENERATED_NAME = re.compile(r"^[0-9a-f]{32,64}(\.\w+)?$")
+
+SWEEP_TARGETS: Tuple[Tuple[str, Optional[Pattern[str]]], ...] = (
+    (DOWNLOAD_FOLDER, None),
+    (PDF_DOWNLOAD_FOLDER, GENERATED_NAME),
+    (EXCEL_DOWNLOAD_FOLDER, None),
+    (WORD_DOWNLOAD_FOLDER, None),
+    (IMAGE_DOWNLOAD_FOLDER, None),
+    (OCR_DOWNLOAD_FOLDER, None),
+)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path):
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    return os.path.getsize(path)
+
+
+class FileJanitor:
+    """Deletes scheduled files from one thread driven by a persisted deadline heap.
+
+    Every worker process saves its schedule next to ``schedule_path`` under its own
+    PID (``janitor_schedule.<pid>.json``), so workers never overwrite each other's
+    pending deletions. At start a worker takes over the files of processes that
+    are gone; a reused PID only delays those deletions until the stale sweep.
+    """
+
+    def __init__(
+        self,
+        schedule_path: str,
+        sweep_targets: Iterable[Tuple[str, Optional[Pattern[str]]]],
+        stale_after: float,
+        persist_interval: float,
+    ) -> None:
+        self.schedule_path = schedule_path
+        self.sweep_targets = tuple(sweep_targets)
+        self.stale_after = stale_after
+        self.persist_interval = persist_interval
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._dirty = False
+        self._files_reclaimed = 0
+        self._bytes_reclaimed = 0
+        self._guards: List[Callable[[str], bool]] = []
+
+    def add_guard(self, guard: Callable[[str], bool]) -> None:
+        """Register a check that postpones a due deletion while it returns True."""
+        self._guards.append(guard)
+
+    def schedule(self, path: str, delay: float) -> None:
+        """Delete path once delay seconds have passed; a later call replaces the deadline."""
+        deadline = time.time() + delay
+        with self._condition:
+            self._deadlines[path] = deadline
+            heapq.heappush(self._heap, (deadline, path))
+            self._dirty = True
+            self._condition.notify()
+        self.start()
+
+    def start(self) -> None:
+        """Start the janitor thread; it restores the saved schedule and sweeps first."""
+        with self._condition:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="file-janitor", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread and persist pending deletions for the next start."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread = self._thread
+        if thread:
+            thread.join()
+        self._persist()
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {
+                "pending": len(self._deadlines),
+                "files_reclaimed": self._files_reclaimed,
+                "bytes_reclaimed": self._bytes_reclaimed,
+            }
+
+    def _run(self) -> None:
+        self._restore()
+        files, size = self.sweep()
+        if files:
+            logger.info("Startup sweep reclaimed %d files (%d bytes)", files, size)
+
+        last_persist = time.monotonic()
+        while True:
+            due: List[str] = []
+            with self._condition:
+                if self._stopping:
+                    return
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    deadline, path = heapq.heappop(self._heap)
+                    # Entries superseded by a later schedule() call are skipped.
+                    if self._deadlines.get(path) == deadline:
+                        del self._deadlines[path]
+                        self._dirty = True
+                        due.append(path)
+                if not due:
+                    timeout = self.persist_interval
+                    if self._heap:
+                        timeout = min(timeout, self._heap[0][0] - now)
+                    self._condition.wait(max(timeout, 0.0))
+
+            for path in due:
+                if any(guard(path) for guard in self._guards):
+                    self.schedule(path, JANITOR_GUARD_RETRY)
+                else:
+                    self._remove(path)
+
+            if time.monotonic() - last_persist >= self.persist_interval:
+                self._persist()
+                last_persist = time.monotonic()
+
+    def _remove(self, path: str) -> Optional[int]:
+        """Delete a file or folder and return the bytes freed, or None if nothing was."""
+        try:
+            size = _path_size(path)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning("Failed to delete %s: %s", path, exc)
+            return None
+
+        with self._condition:
+            self._files_reclaimed += 1
+            self._bytes_reclaimed += size
+        return size
+
+    def sweep(self) -> Tuple[int, int]:
+        """Delete unscheduled files older than stale_after; return (files, bytes) reclaimed."""
+        cutoff = time.time() - self.stale_after
+        with self._condition:
+            scheduled = set(self._deadlines)
+
+        files = 0
+        reclaimed = 0
+        for folder, pattern in self.sweep_targets:
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if path in scheduled or (pattern and not pattern.match(name)):
+                    continue
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                except OSError:
+                    continue
+                size = self._remove(path)
+                if size is not None:
+                    files += 1
+                    reclaimed += size
+        return files, reclaimed
+
+    def _worker_path(self, pid: int) -> str:
+        root, ext = os.path.splitext(self.schedule_path)
+        return f"{root}.{pid}{ext}"
+
+    def _abandoned_schedules(self) -> List[str]:
+        """Schedule files of this process and of processes that no longer run."""
+        root, ext = os.path.splitext(self.schedule_path)
+        worker_file = re.compile(re.escape(f"{root}.") + r"(\d+)" + re.escape(ext) + "$")
+        # Written by versions that kept a single schedule for all workers.
+        paths = [self.schedule_path]
+        for path in glob.glob(f"{glob.escape(root)}.*{glob.escape(ext)}"):
+            match = worker_file.match(path)
+            if match:
+                pid = int(match.group(1))
+                if pid == os.getpid() or not _pid_alive(pid):
+                    paths.append(path)
+        return paths
+
+    def _restore(self) -> None:
+        adopted = []
+        for schedule_path in self._abandoned_schedules():
+            try:
+                with open(schedule_path, "r", encoding="utf-8") as handle:
+                    saved = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            adopted.append(schedule_path)
+            with self._condition:
+                for path, deadline in saved.items():
+                    if deadline < self._deadlines.get(path, float("inf")):
+                        self._deadlines[path] = deadline
+                        heapq.heappush(self._heap, (deadline, path))
+                self._dirty = True
+
+        # Only drop the adopted files once their entries are saved in ours.
+        own_path = self._worker_path(os.getpid())
+        if adopted and self._persist():
+            for schedule_path in adopted:
+                if schedule_path != own_path:
+                    try:
+                        os.remove(schedule_path)
+                    except OSError:
+                        pass
+
+    def _persist(self) -> bool:
+        """Save the schedule to this worker's file; return False if that failed."""
+        with self._condition:
+            if not self._dirty:
+                return True
+            snapshot = dict(self._deadlines)
+            self._dirty = False
+
+        schedule_path = self._worker_path(os.getpid())
+        temp_path = f"{schedule_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump(snapshot, handle)
+            os.replace(temp_path, schedule_path)
+        except OSError as exc:
+            logger.warning("Failed to persist janitor schedule: %s", exc)
+            with self._condition:
+                self._dirty = True
+            return False
+        return True
+
+
+FILE_JANITOR = FileJanitor(
+    JANITOR_SCHEDULE_PATH, SWEEP_TARGETS, JANITOR_STALE_AFTER, JANITOR_PERSIST_INTERVAL
+)
+METRICS.add_stats("janitor", FILE_JANITOR.stats)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.config import (
+    DOWNLOAD_CONCURRENCY,
+    DOWNLOAD_MAX_QUEUED,
+    DOWNLOAD_RETRY_AFTER_DEFAULT,
+)
+from app.services.download_tracker import DOWNLOAD_TRACKER, DownloadTracker
+from app.services.metrics import METRICS
+
+JobFactory = Callable[[], Awaitable[None]]
+
+# Weight of the newest job in the per-source average duration.
+DURATION_SMOOTHING = 0.2
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be admitted because the queue is full."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Download queue is full")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    """Admits download jobs with per-source concurrency limits and a bounded queue.
+
+    All methods run on the event loop thread, so the counters need no lock.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, int],
+        max_queued: int,
+        default_retry_after: int,
+        tracker: DownloadTracker = DOWNLOAD_TRACKER,
+    ) -> None:
+        self.limits = limits
+        self.max_queued = max_queued
+        self.default_retry_after = default_retry_after
+        self.tracker = tracker
+        self._running: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[Tuple[str, JobFactory]]] = {}
+        self._avg_duration: Dict[str, float] = {}
+
+    def _limit(self, source: str) -> int:
+        return max(1, self.limits.get(source, 1))
+
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, source: str, process_id: str, factory: JobFactory) -> None:
+        """Start the job now or queue it; raise QueueFullError when the queue is full."""
+        if self._running.get(source, 0) < self._limit(source):
+            self._start(source, process_id, factory)
+            return
+
+        if self.queued() >= self.max_queued:
+            raise QueueFullError(self.retry_after(source))
+
+        queue = self._queues.setdefault(source, deque())
+        queue.append((process_id, factory))
+        self.tracker.update_job(process_id, status="queued", queue_position=len(queue))
+
+    def retry_after(self, source: str) -> int:
+        """Seconds until a slot is likely to open, from the average job duration."""
+        average: Optional[float] = self._avg_duration.get(source)
+        if average is None:
+            return self.default_retry_after
+        waiting = len(self._queues.get(source, ())) + 1
+        return max(1, math.ceil(average * math.ceil(waiting / self._limit(source))))
+
+    def _start(self, source: str, process_id: str, factory: JobFactory) -> None:
+        self._running[source] = self._running.get(source, 0) + 1
+        self.tracker.update_job(process_id, queue_position=None)
+        asyncio.create_task(self._run(source, factory))
+
+    async def _run(self, source: str, factory: JobFactory) -> None:
+        started = time.monotonic()
+        try:
+            await factory()
+        finally:
+            duration = time.monotonic() - started
+            previous = self._avg_duration.get(source)
+            self._avg_duration[source] = (
+                duration
+                if previous is None
+                else DURATION_SMOOTHING * duration + (1 - DURATION_SMOOTHING) * previous
+            )
+            self._running[source] -= 1
+            self._drain(source)
+
+    def _drain(self, source: str) -> None:
+        queue = self._queues.get(source)
+        if not queue:
+            return
+        while queue and self._running.get(source, 0) < self._limit(source):
+            process_id, factory = queue.popleft()
+            self._start(source, process_id, factory)
+        for position, (process_id, _) in enumerate(queue, start=1):
+            self.tracker.update_job(process_id, queue_position=position)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        sources = set(self.limits) | set(self._running) | set(self._queues)
+        return {
+            source: {
+                "limit": self._limit(source),
+                "running": self._running.get(source, 0),
+                "queued": len(self._queues.get(source, ())),
+            }
+            for source in sorted(sources)
+        }
+
+
+JOB_SCHEDULER = JobScheduler(
+    DOWNLOAD_CONCURRENCY, DOWNLOAD_MAX_QUEUED, DOWNLOAD_RETRY_AFTER_DEFAULT
+)
+METRICS.add_stats("download_scheduler", JOB_SCHEDULER.stats, label="source")
+
+
+def submit_batch(
+    source: str, urls: List[str], submit: Callable[[str], str]
+) -> Dict[str, object]:
+    """Submit each URL on its own and group the admitted jobs into one batch.
+
+    URLs the queue has no room for are reported as rejected rather than failing
+    the whole batch; QueueFullError is raised only when none was admitted.
+    """
+    process_ids: List[str] = []
+    rejected: List[Dict[str, object]] = []
+    error: Optional[QueueFullError] = None
+    for url in urls:
+        try:
+            process_ids.append(submit(url))
+        except QueueFullError as exc:
+            error = exc
+            rejected.append({"url": url, "error": str(exc), "retry_after": exc.retry_after})
+    if error is not None and not process_ids:
+        raise error
+
+    batch = DOWNLOAD_TRACKER.create_batch(source, process_ids)
+    return {"batch_id": batch.batch_id, "process_ids": process_ids, "rejected": rejected}
@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import uuid
+
+from app.config import (
+    JOB_RETENTION,
+    JOB_STORE_BACKEND,
+    JOB_STORE_FLUSH_INTERVAL,
+    JOB_STORE_LEASE,
+    JOB_STORE_PATH,
+)
+
+JobRow = Dict[str, object]
+
+# Statuses a job can still leave; kept here to avoid importing the tracker.
+ACTIVE_STATUSES = ("pending", "queued", "running")
+
+# Finished rows older than the retention are purged at most this often (seconds).
+PURGE_INTERVAL = 60.0
+
+# Tables as first released; later columns and indexes are added by MIGRATIONS so
+# that databases written by earlier versions are upgraded in place.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    process_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner_pid INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_aliases (
+    alias_id TEXT PRIMARY KEY,
+    process_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_batches (
+    batch_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> Set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_created_at(conn: sqlite3.Connection) -> None:
+    """Version 1: list jobs by creation time."""
+    # Databases created before versioning may already have the column.
+    if "created_at" not in _columns(conn, "jobs"):
+        conn.execute("ALTER TABLE jobs ADD COLUMN created_at REAL NOT NULL DEFAULT 0")
+        conn.execute(
+            "UPDATE jobs SET created_at = updated_at, "
+            "data = json_set(data, '$.created_at', "
+            "COALESCE(json_extract(data, '$.created_at'), updated_at))"
+        )
+    # The first release indexed (status, updated_at) under the same name.
+    conn.execute("DROP INDEX IF EXISTS jobs_by_status")
+    conn.execute("CREATE INDEX jobs_by_status ON jobs (status, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_by_source ON jobs (source, created_at)")
+
+
+def _add_owner_leases(conn: sqlite3.Connection) -> None:
+    """Version 2: jobs belong to a worker start that renews a lease while alive."""
+    conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+    conn.execute(
+        "CREATE TABLE job_owners (owner TEXT PRIMARY KEY, pid INTEGER NOT NULL, "
+        "heartbeat_at REAL NOT NULL)"
+    )
+
+
+# Applied in order; PRAGMA user_version records how many have run.
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _add_created_at,
+    _add_owner_leases,
+]
+
+
+class JobStore(ABC):
+    """Storage backend that shares DownloadTracker jobs beyond one process.
+
+    The tracker keeps the jobs it runs in memory and writes every change through
+    the store; jobs it does not own (other workers, or earlier runs) are read back
+    from it.
+    """
+
+    # Whether other processes write to this store, so listings must come from it.
+    shared = False
+
+    @abstractmethod
+    def save(self, row: JobRow, immediate: bool = False) -> None:
+        """Record the latest state of a job; immediate writes skip batching."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_alias(self, alias_id: str, process_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_batch(self, row: JobRow) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_batch(self, batch_id: str) -> Optional[JobRow]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load(self, process_id: str) -> Optional[JobRow]:
+        """Return the job for a process or alias id, or None."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, process_id: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_jobs(
+        self,
+        status: Optional[str],
+        source: Optional[str],
+        offset: int,
+        limit: int,
+    ) -> Tuple[int, List[JobRow]]:
+        """Return (total, page) of stored jobs matching the filters, newest first."""
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Write any batched changes."""
+
+    def close(self) -> None:
+        """Flush and release the backend."""
+
+
+class MemoryJobStore(JobStore):
+    """Default backend: the tracker's own table is the only copy of each job."""
+
+    def save(self, row: JobRow, immediate: bool = False) -> None:
+        pass
+
+    def save_alias(self, alias_id: str, process_id: str) -> None:
+        pass
+
+    def save_batch(self, row: JobRow) -> None:
+        pass
+
+    def load_batch(self, batch_id: str) -> Optional[JobRow]:
+        return None
+
+    def load(self, process_id: str) -> Optional[JobRow]:
+        return None
+
+    def delete(self, process_id: str) -> None:
+        pass
+
+    def list_jobs(
+        self,
+        status: Optional[str],
+        source: Optional[str],
+        offset: int,
+        limit: int,
+    ) -> Tuple[int, List[JobRow]]:
+        # Not shared, so the tracker lists its own jobs instead.
+        return 0, []
+
+
+class SQLiteJobStore(JobStore):
+    """SQLite (WAL) backend shared by the workers of one host.
+
+    Progress updates are coalesced per job and written by a background thread
+    every ``flush_interval`` seconds in one transaction; new jobs, aliases, batches
+    and status changes are written immediately so any worker can read them at once.
+    Finished jobs are purged ``retention`` seconds after their last update.
+
+    Each store instance (one per worker start) owns the jobs it writes under a
+    random token and renews a lease for it every third of ``lease`` seconds.
+    Unfinished jobs whose owner's lease has expired are failed, so a crashed or
+    restarted worker cannot leave jobs running forever; PIDs are reused too
+    often after a restart to tell.
+    """
+
+    shared = True
+
+    def __init__(
+        self, path: str, flush_interval: float, retention: float, lease: float
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self._pending: Dict[str, JobRow] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self.heartbeat()
+        self.fail_orphans()
+        self._thread = threading.Thread(
+            target=self._run, name="job-store-flush", daemon=True
+        )
+        self._thread.start()
+
+    def _migrate(self) -> None:
+        """Bring an existing database up to the current schema version."""
+        # IMMEDIATE takes the write lock first, so workers starting together
+        # run each migration once.
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                migration(self._conn)
+                self._conn.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            self._conn.rollback()
+            raise
+        self._conn.commit()
+
+    def heartbeat(self) -> None:
+        """Renew this worker's lease on the jobs it owns."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_owners (owner, pid, heartbeat_at) VALUES (?, ?, ?)",
+                (self.owner, os.getpid(), time.time()),
+            )
+
+    def fail_orphans(self) -> None:
+        """Fail unfinished jobs whose owner's lease expired (e.g. after a restart)."""
+        placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+        now = time.time()
+        expired = now - self.lease
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT process_id, data FROM jobs "
+                f"WHERE status IN ({placeholders}) AND owner NOT IN "
+                "(SELECT owner FROM job_owners WHERE heartbeat_at >= ?)",
+                (*ACTIVE_STATUSES, expired),
+            ).fetchall()
+            for process_id, data in rows:
+                row = json.loads(data)
+                row.update(
+                    status="failed",
+                    error="Interrupted by a server restart",
+                    finished_at=now,
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ?, data = ? WHERE process_id = ?",
+                    ("failed", now, json.dumps(row), process_id),
+                )
+            self._conn.execute("DELETE FROM job_owners WHERE heartbeat_at < ?", (expired,))
+
+    def save(self, row: JobRow, immediate: bool = False) -> None:
+        with self._lock:
+            self._pending[row["process_id"]] = row
+            if immediate:
+                self._flush_locked()
+
+    def save_alias(self, alias_id: str, process_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_aliases (alias_id, process_id) VALUES (?, ?)",
+                (alias_id, process_id),
+            )
+
+    def save_batch(self, row: JobRow) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_batches (batch_id, created_at, data) VALUES (?, ?, ?)",
+                (row["batch_id"], row["created_at"], json.dumps(row)),
+            )
+
+    def load_batch(self, batch_id: str) -> Optional[JobRow]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM job_batches WHERE batch_id = ?", (batch_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load(self, process_id: str) -> Optional[JobRow]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT process_id FROM job_aliases WHERE alias_id = ?", (process_id,)
+            ).fetchone()
+            if row:
+                process_id = row[0]
+            pending = self._pending.get(process_id)
+            if pending is not None:
+                return dict(pending)
+            row = self._conn.execute(
+                "SELECT data FROM jobs WHERE process_id = ?", (process_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def list_jobs(
+        self,
+        status: Optional[str],
+        source: Optional[str],
+        offset: int,
+        limit: int,
+    ) -> Tuple[int, List[JobRow]]:
+        clauses = []
+        params: List[object] = []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM jobs {where}", params
+            ).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT data FROM jobs {where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return total, [json.loads(row[0]) for row in rows]
+
+    def delete(self, process_id: str) -> None:
+        with self._lock, self._conn:
+            self._pending.pop(process_id, None)
+            self._conn.execute("DELETE FROM jobs WHERE process_id = ?", (process_id,))
+            self._conn.execute("DELETE FROM job_aliases WHERE process_id = ?", (process_id,))
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        owner_pid = os.getpid()
+        now = time.time()
+        rows = [
+            (
+                row["process_id"],
+                row["source"],
+                row["status"],
+                self.owner,
+                owner_pid,
+                row["created_at"],
+                now,
+                json.dumps(row),
+            )
+            for row in self._pending.values()
+        ]
+        self._pending.clear()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO jobs "
+                "(process_id, source, status, owner, owner_pid, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def purge(self) -> None:
+        """Delete finished jobs, their aliases and idle batches past the retention period."""
+        cutoff = time.time() - self.retention
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+                (cutoff,),
+            )
+            self._conn.execute(
+                "DELETE FROM job_aliases WHERE process_id NOT IN (SELECT process_id FROM jobs)"
+            )
+            # A batch stays while any of its jobs, or the job an alias points to, is active.
+            placeholders = ",".join("?" * len(ACTIVE_STATUSES))
+            self._conn.execute(
+                "DELETE FROM job_batches WHERE created_at < ? AND NOT EXISTS ("
+                "SELECT 1 FROM json_each(job_batches.data, '$.process_ids') AS child "
+                "LEFT JOIN job_aliases ON job_aliases.alias_id = child.value "
+                "JOIN jobs ON jobs.process_id = COALESCE(job_aliases.process_id, child.value) "
+                f"WHERE jobs.status IN ({placeholders}))",
+                (cutoff, *ACTIVE_STATUSES),
+            )
+
+    def _run(self) -> None:
+        last_purge = 0.0
+        last_heartbeat = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - last_heartbeat >= self.lease / 3:
+                last_heartbeat = time.monotonic()
+                self.heartbeat()
+                self.fail_orphans()
+            if time.monotonic() - last_purge >= PURGE_INTERVAL:
+                last_purge = time.monotonic()
+                self.purge()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM job_owners WHERE owner = ?", (self.owner,))
+            self._conn.close()
+
+
+def build_job_store() -> JobStore:
+    """Factory to choose the job storage backend."""
+    if JOB_STORE_BACKEND == "sqlite":
+        return SQLiteJobStore(
+            JOB_STORE_PATH, JOB_STORE_FLUSH_INTERVAL, JOB_RETENTION, JOB_STORE_LEASE
+        )
+    return MemoryJobStore()
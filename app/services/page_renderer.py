@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, NamedTuple, Tuple
+
+from app.config import (
+    PDF_DOWNLOAD_FOLDER,
+    PDF_OPEN_DOCUMENTS,
+    PDF_PAGE_MEMORY_CACHE_BYTES,
+)
+from app.services.metrics import METRICS, observe_stage
+from app.services.result_cache import RESULT_CACHE, ResultCache
+from app.utils.pdf_ops import ImageOptions, encode_page_image, render_page_pixmap
+
+if TYPE_CHECKING:
+    import fitz
+
+DOCUMENT_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+class DocumentNotFound(LookupError):
+    """Raised for document ids that were never uploaded or have expired."""
+
+
+class _OpenDocument(NamedTuple):
+    doc: "fitz.Document"
+    lock: threading.Lock
+
+
+class PageRenderer:
+    """Renders single pages of uploaded documents with two cache tiers.
+
+    Rendered pages are kept in an in-memory LRU bounded by ``memory_bytes`` and
+    in the on-disk result cache, keyed by document hash, page and image options.
+    Documents that still need rendering stay open in a small LRU of ``fitz``
+    handles so repeat views skip parsing the PDF again. A PyMuPDF document is not
+    safe to share between threads, so each handle has its own lock: pages of one
+    document rasterize one at a time, different documents in parallel, and
+    encoding happens outside the lock.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        max_open: int,
+        memory_bytes: int,
+        disk_cache: ResultCache = RESULT_CACHE,
+    ) -> None:
+        self.folder = folder
+        self.max_open = max_open
+        self.memory_bytes = memory_bytes
+        self.disk_cache = disk_cache
+        self._documents: "OrderedDict[str, _OpenDocument]" = OrderedDict()
+        self._pages: "OrderedDict[str, bytes]" = OrderedDict()
+        self._page_bytes = 0
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "renders": 0}
+
+    def document_path(self, document_id: str) -> str:
+        if not DOCUMENT_ID.match(document_id):
+            raise DocumentNotFound(document_id)
+        return os.path.join(self.folder, f"{document_id}.pdf")
+
+    def _open(self, document_id: str) -> _OpenDocument:
+        import fitz
+
+        evicted = []
+        with self._open_lock:
+            handle = self._documents.get(document_id)
+            if handle is not None:
+                self._documents.move_to_end(document_id)
+                return handle
+            path = self.document_path(document_id)
+            if not os.path.exists(path):
+                raise DocumentNotFound(document_id)
+            handle = _OpenDocument(fitz.open(path), threading.Lock())
+            self._documents[document_id] = handle
+            while len(self._documents) > self.max_open:
+                evicted.append(self._documents.popitem(last=False)[1])
+        for stale in evicted:
+            self._close(stale)
+        return handle
+
+    @staticmethod
+    def _close(handle: _OpenDocument) -> None:
+        # Waits for a render still using the handle.
+        with handle.lock:
+            handle.doc.close()
+
+    def page_count(self, document_id: str) -> int:
+        handle = self._open(document_id)
+        with handle.lock:
+            if handle.doc.is_closed:
+                return self.page_count(document_id)
+            return handle.doc.page_count
+
+    def forget(self, document_id: str) -> None:
+        """Close the handle of a document that was replaced or removed."""
+        with self._open_lock:
+            handle = self._documents.pop(document_id, None)
+        if handle is not None:
+            self._close(handle)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        with self._lock:
+            previous = self._pages.pop(key, None)
+            if previous is not None:
+                self._page_bytes -= len(previous)
+            self._pages[key] = data
+            self._page_bytes += len(data)
+            while self._page_bytes > self.memory_bytes and len(self._pages) > 1:
+                _, evicted = self._pages.popitem(last=False)
+                self._page_bytes -= len(evicted)
+
+    def render(self, document_id: str, page_number: int, options: ImageOptions) -> bytes:
+        """Return the page (1-based) rendered and encoded with options."""
+        if not os.path.exists(self.document_path(document_id)):
+            raise DocumentNotFound(document_id)
+        # Zip compression does not apply to a single image.
+        encoding = options._replace(compress=False)._asdict()
+        key = ResultCache.make_key(document_id, "page", page=page_number, **encoding)
+
+        with self._lock:
+            data = self._pages.get(key)
+            if data is not None:
+                self._pages.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return data
+
+        data = self.disk_cache.read(key)
+        if data is not None:
+            self._remember(key, data)
+            with self._lock:
+                self._counts["disk_hits"] += 1
+            return data
+
+        pixmap, render_seconds = self._rasterize(document_id, page_number, options)
+        image = encode_page_image(pixmap, options, render_seconds)
+        observe_stage("page_render", image.render_seconds)
+        observe_stage("page_encode", image.encode_seconds)
+        data = image.data
+
+        with self._lock:
+            self._counts["renders"] += 1
+        self._remember(key, data)
+        self.disk_cache.put_bytes(key, data, f".{options.format}")
+        return data
+
+    def _rasterize(
+        self, document_id: str, page_number: int, options: ImageOptions
+    ) -> Tuple[fitz.Pixmap, float]:
+        handle = self._open(document_id)
+        with handle.lock:
+            # Evicted by another thread between opening and locking: reopen.
+            if handle.doc.is_closed:
+                return self._rasterize(document_id, page_number, options)
+            page_count = handle.doc.page_count
+            if not 1 <= page_number <= page_count:
+                raise ValueError(
+                    f"Page {page_number} is outside the {page_count}-page document."
+                )
+            started = time.perf_counter()
+            pixmap = render_page_pixmap(
+                handle.doc.load_page(page_number - 1), options.dpi, options.grayscale
+            )
+            return pixmap, time.perf_counter() - started
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open_documents": len(self._documents),
+                "memory_entries": len(self._pages),
+                "memory_bytes": self._page_bytes,
+                **self._counts,
+            }
+
+
+PAGE_RENDERER = PageRenderer(
+    PDF_DOWNLOAD_FOLDER, PDF_OPEN_DOCUMENTS, PDF_PAGE_MEMORY_CACHE_BYTES
+)
+METRICS.add_stats("page_renderer", PAGE_RENDERER.stats)
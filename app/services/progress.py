@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import Dict, Optional
+
+from app.config import PROGRESS_MIN_DELTA, PROGRESS_MIN_INTERVAL
+from app.services.download_tracker import DOWNLOAD_TRACKER, DownloadTracker
+
+# Weight of the newest sample in the smoothed transfer rate.
+SPEED_SMOOTHING = 0.3
+
+
+class ProgressReporter:
+    """Coalesces progress writes for one job and keeps its throughput and ETA.
+
+    Intermediate updates reach the tracker at most every ``min_interval`` seconds
+    unless progress moved by ``min_delta`` percent; terminal states are written
+    immediately. A reporter is fed by a single producer (a yt-dlp hook thread or
+    a stream loop), so it keeps no lock of its own.
+    """
+
+    def __init__(
+        self,
+        process_id: str,
+        tracker: DownloadTracker = DOWNLOAD_TRACKER,
+        min_interval: float = PROGRESS_MIN_INTERVAL,
+        min_delta: float = PROGRESS_MIN_DELTA,
+    ) -> None:
+        self.process_id = process_id
+        self.tracker = tracker
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self._last_write = 0.0
+        self._last_progress = 0.0
+        self._sample_time: Optional[float] = None
+        self._sample_bytes = 0
+        self._speed: Optional[float] = None
+        self._streaming = False
+
+    def start(self) -> None:
+        self._sample_time = time.monotonic()
+        self.tracker.update_job(self.process_id, status="running", progress=0.0)
+
+    def update(self, downloaded: int, total: Optional[int] = None, force: bool = False) -> None:
+        """Record bytes downloaded so far and write to the tracker when due."""
+        now = time.monotonic()
+        self._measure(downloaded, now)
+
+        progress = (downloaded / total) * 100 if total and total > 0 else 0.0
+        due = (
+            force
+            or now - self._last_write >= self.min_interval
+            or abs(progress - self._last_progress) >= self.min_delta
+        )
+        if not due:
+            return
+
+        eta = None
+        if total and self._speed:
+            eta = max(total - downloaded, 0) / self._speed
+        self._last_write = now
+        self._last_progress = progress
+        self.tracker.update_job(
+            self.process_id,
+            bytes_downloaded=downloaded,
+            total_bytes=int(total) if total else None,
+            progress=progress,
+            speed=self._speed,
+            eta=eta,
+        )
+
+    def _measure(self, downloaded: int, now: float) -> None:
+        if self._sample_time is None or downloaded < self._sample_bytes:
+            # First sample, or yt-dlp moved on to the next format of a merge.
+            self._sample_time = now
+            self._sample_bytes = downloaded
+            return
+        elapsed = now - self._sample_time
+        if elapsed < 0.05:
+            return
+        rate = (downloaded - self._sample_bytes) / elapsed
+        self._speed = (
+            rate
+            if self._speed is None
+            else SPEED_SMOOTHING * rate + (1 - SPEED_SMOOTHING) * self._speed
+        )
+        self._sample_time = now
+        self._sample_bytes = downloaded
+
+    def stream_from(self, partial_path: str, suggested_name: Optional[str] = None) -> None:
+        """Publish the file being written so clients can follow it while it grows."""
+        self._streaming = True
+        updates = {"partial_path": partial_path}
+        if suggested_name:
+            updates["suggested_name"] = suggested_name
+        self.tracker.update_job(self.process_id, **updates)
+
+    def ytdlp_hook(self, data: Dict) -> None:
+        """Progress hook for yt-dlp's ``progress_hooks`` option."""
+        status = data.get("status")
+        if status == "downloading":
+            info = data.get("info_dict") or {}
+            # Merged formats are downloaded to separate files and muxed at the end,
+            # so only single-format downloads have one file worth following.
+            streamable = data.get("tmpfilename") and not info.get("requested_formats")
+            if streamable and not self._streaming:
+                self.stream_from(
+                    data["tmpfilename"], os.path.basename(data.get("filename") or "")
+                )
+            downloaded = int(data.get("downloaded_bytes") or 0)
+            total = data.get("total_bytes") or data.get("total_bytes_estimate")
+            self.update(downloaded, total)
+        elif status == "finished":
+            self.tracker.update_job(self.process_id, progress=100.0, eta=0.0)
+
+    def complete(self, file_path: str, suggested_name: str) -> None:
+        self.tracker.update_job(
+            self.process_id,
+            status="completed",
+            progress=100.0,
+            eta=0.0,
+            file_path=file_path,
+            suggested_name=suggested_name,
+        )
+
+    def fail(self, error: str) -> None:
+        self.tracker.update_job(self.process_id, status="failed", error=error)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import RESULT_CACHE_FOLDER, RESULT_CACHE_MAX_BYTES
+from app.services.metrics import METRICS
+
+
+class ResultCache:
+    """Content-addressed store for conversion outputs with an LRU byte budget."""
+
+    def __init__(self, folder: str, max_bytes: int) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+        self._load_existing()
+
+    @staticmethod
+    def make_key(content_hash: str, conversion: str, **options) -> str:
+        """Build a cache key from the upload hash, conversion type and its options."""
+        encoded_options = json.dumps(options, sort_keys=True, default=str)
+        raw = f"{content_hash}:{conversion}:{encoded_options}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _load_existing(self) -> None:
+        """Index outputs left by a previous run, oldest access first."""
+        if not os.path.isdir(self.folder):
+            return
+        found = []
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            key, ext = os.path.splitext(name)
+            if not ext or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            found.append((stat.st_mtime, key, path, stat.st_size))
+
+        with self._lock:
+            for _, key, path, size in sorted(found):
+                self._entries[key] = (path, size)
+                self._total_bytes += size
+            self._evict_locked()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached output path for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and os.path.exists(entry[0]):
+                self._entries.move_to_end(key)
+                self._hits += 1
+                path = entry[0]
+            else:
+                if entry:
+                    self._entries.pop(key)
+                    self._total_bytes -= entry[1]
+                self._misses += 1
+                return None
+
+        # Refresh the mtime so recency survives a restart.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, key: str, source_path: str, ext: str) -> str:
+        """Move a finished output into the cache and return its cached path."""
+        cached_path = os.path.join(self.folder, f"{key}{ext}")
+        os.replace(source_path, cached_path)
+        size = os.path.getsize(cached_path)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (cached_path, size)
+            self._total_bytes += size
+            self._evict_locked()
+        return cached_path
+
+    def read(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for key, or None on a miss."""
+        path = self.get(key)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def put_bytes(self, key: str, data: bytes, ext: str) -> str:
+        """Cache in-memory output (such as a single page) and return its cached path."""
+        fd, temp_path = tempfile.mkstemp(dir=self.folder, suffix=".part")
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+        return self.put(key, temp_path, ext)
+
+    def link(self, key: str, dest_path: str) -> Optional[str]:
+        """Give a cached output a second name that survives its eviction.
+
+        Jobs hand their file path out for much longer than the cache promises to
+        keep an entry, so they get a hard link (or, across file systems, a copy)
+        of their own. Returns dest_path, or None if the entry is gone.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            try:
+                os.link(entry[0], dest_path)
+            except FileNotFoundError:
+                return None
+            except OSError:
+                shutil.copyfile(entry[0], dest_path)
+        return dest_path
+
+    def _evict_locked(self) -> None:
+        # The most recent entry is never evicted so a fresh result can still be served.
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (path, size) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self._evictions += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+RESULT_CACHE = ResultCache(RESULT_CACHE_FOLDER, RESULT_CACHE_MAX_BYTES)
+METRICS.add_stats("result_cache", RESULT_CACHE.stats)
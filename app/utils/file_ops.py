@@ -1,13 +1,10 @@
 import os
 import re
-import threading
-import time
 import unicodedata
-import uuid
+from typing import Iterable, Iterator, List, Optional, Tuple
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
 
-from fastapi import UploadFile
-
-from app.config import CHUNK_SIZE
+from app.services.janitor import FILE_JANITOR
 
 
 def ascii_filename(filename: str) -> str:
@@ -19,13 +16,7 @@ def ascii_filename(filename: str) -> str:
 
 def delete_file_later(file_path: str, delay: int = 300) -> None:
     """Delete a file after a delay (default 5 minutes)."""
-
-    def delete():
-        time.sleep(delay)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
-    threading.Thread(target=delete, daemon=True).start()
+    FILE_JANITOR.schedule(file_path, delay)
 
 
 def safe_stem(filename: str) -> str:
@@ -35,18 +26,75 @@ def safe_stem(filename: str) -> str:
     return sanitized or "file"
 
 
-async def save_upload_file(upload_file: UploadFile, destination_folder: str) -> str:
-    """Persist UploadFile contents to disk using chunks to avoid large memory spikes."""
-    ext = os.path.splitext(upload_file.filename)[1]
-    unique_name = uuid.uuid4().hex + (ext.lower() if ext else "")
-    file_path = os.path.join(destination_folder, unique_name)
+class _ZipStreamBuffer:
+    """Write-only sink that collects the bytes ZipFile emits so they can be streamed."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip_stream(
+    entries: Iterable[Tuple[str, bytes]], compression: int = ZIP_STORED
+) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk as each (arcname, data) entry is produced."""
+    buffer = _ZipStreamBuffer()
+    with ZipFile(buffer, "w", compression=compression) as zip_file:
+        for arcname, data in entries:
+            zip_file.writestr(arcname, data)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    tail = buffer.drain()
+    if tail:
+        yield tail
+
 
-    with open(file_path, "wb") as buffer:
-        while True:
-            chunk = await upload_file.read(CHUNK_SIZE)
-            if not chunk:
-                break
-            buffer.write(chunk)
+def iter_zip_files(
+    files: Iterable[Tuple[str, str]],
+    trailer: Iterable[Tuple[str, bytes]] = (),
+    chunk_size: int = 1024 * 1024,
+    skipped: Optional[List[str]] = None,
+) -> Iterator[bytes]:
+    """Yield a stored ZIP of (arcname, path) files read chunk by chunk, then trailer entries.
 
-    await upload_file.seek(0)
-    return file_path
+    Files deleted before they are reached are left out and their arcnames added to
+    ``skipped``. The trailer is only iterated once every file was written, so a
+    generator there can describe what was skipped.
+    """
+    buffer = _ZipStreamBuffer()
+    with ZipFile(buffer, "w", compression=ZIP_STORED) as zip_file:
+        for arcname, path in files:
+            try:
+                # The known size lets ZipFile pick ZIP64 up front for large files.
+                info = ZipInfo.from_file(path, arcname)
+                source = open(path, "rb")
+            except FileNotFoundError:
+                if skipped is not None:
+                    skipped.append(arcname)
+                continue
+            with source, zip_file.open(info, "w") as target:
+                while True:
+                    data = source.read(chunk_size)
+                    if not data:
+                        break
+                    target.write(data)
+                    chunk = buffer.drain()
+                    if chunk:
+                        yield chunk
+        for arcname, data in trailer:
+            zip_file.writestr(arcname, data)
+    tail = buffer.drain()
+    if tail:
+        yield tail
@@ -1,57 +1,607 @@
-import os
-from zipfile import ZipFile
+import importlib.util
+import io
+import json
+import math
+import shutil
+import time
+from collections import deque
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
 
-import fitz
-import pandas as pd
-import pdfplumber
+from app.config import (
+    PDF_CONVERT_PARALLEL_MIN_PAGES,
+    PDF_CONVERT_WORKERS,
+    PDF_OCR_WORKERS,
+    PDF_RENDER_PARALLEL_MIN_PAGES,
+    PDF_RENDER_WORKERS,
+    TESSERACT_CMD,
+)
+from app.services.executors import PDF_PROCESS_POOL
+from app.services.metrics import iter_stage, observe_stage, record_pages, track_stage
+from app.utils.file_ops import iter_zip_stream
 
-from pdf2docx import Converter
+# The PDF libraries are imported where they are used, so that loading this module
+# (and the routes using it) stays cheap for workers that never convert a PDF.
+if TYPE_CHECKING:
+    import fitz
 
+# Called with (pages_done, total_pages) as a conversion moves through the document.
+ProgressCallback = Callable[[int, int], None]
+
+# Rows of cell strings, as returned by pdfplumber.
+Table = List[List[Optional[str]]]
+
+# Per-page encode stats stored as the last entry of every image archive.
+MANIFEST_NAME = "manifest.json"
+
+
+def select_pages(pages: Optional[str], page_count: int) -> List[int]:
+    """Turn a 1-based spec such as ``"1-3,7,10-"`` into sorted zero-based page indices."""
+    if not pages:
+        return list(range(page_count))
+
+    selected = set()
+    for part in pages.split(","):
+        first, dash, last = part.strip().partition("-")
+        try:
+            start = int(first) if first else 1
+            end = (int(last) if last else page_count) if dash else start
+        except ValueError:
+            raise ValueError(f"Invalid page range: {pages}") from None
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {pages}")
+        selected.update(range(start - 1, min(end, page_count)))
+
+    if not selected:
+        raise ValueError(f"Page range {pages} is outside the {page_count}-page document.")
+    return sorted(selected)
+
+
+def _iter_pool_results(
+    task: Callable[..., List[Any]],
+    pdf_path: str,
+    page_indices: Sequence[int],
+    workers: int,
+    *args,
+) -> Iterator[Any]:
+    """Run ``task(pdf_path, chunk, *args)`` over chunks of pages in the PDF process pool.
+
+    At most ``workers * 2`` chunks are in the pool at once. Yields the per-page
+    results in page order.
+    """
+    # Several chunks per worker so the first pages come back early, and a bounded
+    # window of in-flight chunks so finished pages don't pile up in memory.
+    chunk_size = max(1, math.ceil(len(page_indices) / (workers * 4)))
+    chunks = deque(
+        page_indices[start : start + chunk_size]
+        for start in range(0, len(page_indices), chunk_size)
+    )
+    pending = deque()
+    try:
+        while chunks or pending:
+            while chunks and len(pending) < workers * 2:
+                pending.append(
+                    PDF_PROCESS_POOL.submit(task, pdf_path, chunks.popleft(), *args)
+                )
+            yield from pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _iter_page_tables(pdf_path: str, page_indices: Sequence[int]) -> Iterator[List[Table]]:
+    """Yield every table found on each page, releasing parsed page objects as it goes."""
+    import pdfplumber
 
-def convert_pdf_tables_to_excel(pdf_path: str, excel_path: str) -> None:
-    """Extract tables into an Excel workbook."""
-    all_tables = []
     with pdfplumber.open(pdf_path) as pdf:
-        for page in pdf.pages:
-            table = page.extract_table()
-            if table:
-                df = pd.DataFrame(table[1:], columns=table[0])
-                all_tables.append(df)
+        for page_index in page_indices:
+            page = pdf.pages[page_index]
+            yield [table for table in page.extract_tables() if table]
+            page.close()
 
-    if not all_tables:
+
+def _extract_tables_chunk(pdf_path: str, page_indices: Sequence[int]) -> List[List[Table]]:
+    """Pool worker: tables for a chunk of pages."""
+    return list(_iter_page_tables(pdf_path, page_indices))
+
+
+def convert_pdf_tables_to_excel(
+    pdf_path: str,
+    excel_path: str,
+    pages: Optional[str] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    """Extract every table into an Excel workbook, one worksheet per table."""
+    import pdfplumber
+    import xlsxwriter
+
+    with pdfplumber.open(pdf_path) as pdf:
+        page_indices = select_pages(pages, len(pdf.pages))
+
+    started = time.perf_counter()
+    workers = 1
+    if len(page_indices) >= PDF_CONVERT_PARALLEL_MIN_PAGES:
+        workers = min(PDF_CONVERT_WORKERS, len(page_indices))
+    page_tables = iter_stage(
+        _iter_pool_results(_extract_tables_chunk, pdf_path, page_indices, workers),
+        "pdf_table_extract",
+    )
+
+    # constant_memory flushes each row to disk as soon as the next one starts, so
+    # the workbook is created only once there is a table to put in it.
+    workbook = None
+    table_count = 0
+    try:
+        for page_number, tables in enumerate(page_tables, start=1):
+            for table in tables:
+                if workbook is None:
+                    workbook = xlsxwriter.Workbook(excel_path, {"constant_memory": True})
+                    header_format = workbook.add_format({"bold": True, "border": 1})
+                table_count += 1
+                with track_stage("xlsx_write"):
+                    worksheet = workbook.add_worksheet(f"Sheet{table_count}")
+                    worksheet.write_row(0, 0, table[0], header_format)
+                    for row_index, row in enumerate(table[1:], start=1):
+                        worksheet.write_row(row_index, 0, row)
+            if progress_callback:
+                progress_callback(page_number, len(page_indices))
+    finally:
+        if workbook is not None:
+            with track_stage("xlsx_write"):
+                workbook.close()
+
+    if workbook is None:
         raise ValueError("No tables found in PDF.")
+    record_pages("to_excel", len(page_indices), time.perf_counter() - started)
 
-    with pd.ExcelWriter(excel_path, engine="xlsxwriter") as writer:
-        for i, df in enumerate(all_tables):
-            sheet_name = f"Sheet{i+1}"
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
 
+def _parse_docx_pages(
+    pdf_path: str, page_indices: Sequence[int]
+) -> List[Optional[Dict[str, Any]]]:
+    """Pool worker: parse a chunk of pages and return their pdf2docx layout data."""
+    from pdf2docx import Converter
+
+    cv = Converter(pdf_path)
+    try:
+        settings = cv.default_settings
+        cv.load_pages(pages=page_indices).parse_document(**settings).parse_pages(**settings)
+        parsed = {raw_page["id"]: raw_page for raw_page in cv.store()["pages"]}
+    finally:
+        cv.close()
+    # Pages that failed to parse (and were skipped) come back as None.
+    return [parsed.get(page_index) for page_index in page_indices]
+
+
+def _convert_docx_pages(
+    pdf_path: str,
+    word_path: str,
+    page_indices: Sequence[int],
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    """Pool worker: convert the selected pages into a DOCX file in one process."""
+    from pdf2docx import Converter
 
-def convert_pdf_to_docx(pdf_path: str, word_path: str) -> None:
-    """Convert PDF into DOCX using pdf2docx."""
     cv = Converter(pdf_path)
     try:
-        cv.convert(word_path, start=0, end=None)
+        if not progress_callback:
+            cv.convert(word_path, pages=page_indices)
+            return
+
+        # Same steps as Converter.convert, but pages are parsed one at a time so
+        # progress can be reported; make_docx only looks at finalized pages.
+        settings = cv.default_settings
+        cv.load_pages(pages=page_indices).parse_document(**settings)
+        selected = [page for page in cv.pages if not page.skip_parsing]
+        for page in selected:
+            page.skip_parsing = True
+        for page_number, page in enumerate(selected, start=1):
+            page.skip_parsing = False
+            cv.parse_pages(**settings)
+            page.skip_parsing = True
+            progress_callback(page_number, len(selected))
+        cv.make_docx(word_path, **settings)
     finally:
         cv.close()
 
 
-def create_images_zip(pdf_path: str, session_folder: str, zip_path: str, base_name: str) -> None:
-    """Render PDF pages to PNG and store them inside a zip archive."""
-    image_paths = []
+def convert_pdf_to_docx(
+    pdf_path: str,
+    word_path: str,
+    pages: Optional[str] = None,
+    parallel: bool = False,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    """Convert PDF into DOCX using pdf2docx."""
+    import fitz
+
+    started = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        page_indices = select_pages(pages, doc.page_count)
+    workers = min(PDF_CONVERT_WORKERS, len(page_indices))
+
+    if parallel and workers > 1:
+        from pdf2docx import Converter
+
+        # Like pdf2docx's multi_processing mode, workers parse page chunks and
+        # the layouts are restored here for a single make_docx; the data comes
+        # back through the pool rather than JSON files in the working directory.
+        cv = Converter(pdf_path)
+        try:
+            cv.load_pages(pages=page_indices)
+            parsed_pages = iter_stage(
+                _iter_pool_results(_parse_docx_pages, pdf_path, page_indices, workers),
+                "docx_parse",
+            )
+            for page_number, raw_page in enumerate(parsed_pages, start=1):
+                if raw_page is not None:
+                    cv.restore({"pages": [raw_page]})
+                if progress_callback:
+                    progress_callback(page_number, len(page_indices))
+            with track_stage("docx_make"):
+                cv.make_docx(word_path, **cv.default_settings)
+        finally:
+            cv.close()
+    else:
+        with track_stage("docx_convert"):
+            PDF_PROCESS_POOL.submit(
+                _convert_docx_pages,
+                pdf_path,
+                word_path,
+                page_indices,
+                progress_callback=progress_callback,
+            ).result()
+    record_pages("to_word", len(page_indices), time.perf_counter() - started)
+
+
+IMAGE_FORMATS = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+class ImageOptions(NamedTuple):
+    """How rendered pages are encoded."""
+
+    format: str = "png"
+    dpi: int = 72
+    quality: int = 85
+    grayscale: bool = False
+    compress: bool = False
+
+    def validate(self) -> "ImageOptions":
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format: {self.format}")
+        if self.format == "webp" and importlib.util.find_spec("PIL") is None:
+            raise ValueError("WebP output requires Pillow to be installed.")
+        return self
+
+    @property
+    def media_type(self) -> str:
+        return IMAGE_FORMATS[self.format]
+
+    @property
+    def zip_compression(self) -> int:
+        # PNG, JPEG and WebP are compressed already; deflate mostly costs CPU.
+        return ZIP_DEFLATED if self.compress else ZIP_STORED
+
+
+class PageImage(NamedTuple):
+    data: bytes
+    width: int
+    height: int
+    render_seconds: float
+    encode_seconds: float
+
+
+def _encode_pixmap(pixmap: "fitz.Pixmap", options: ImageOptions) -> bytes:
+    if options.format == "jpeg":
+        return pixmap.tobytes("jpeg", jpg_quality=options.quality)
+    if options.format == "webp":
+        from PIL import Image
+
+        mode = "L" if pixmap.n == 1 else "RGB"
+        image = Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples)
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=options.quality)
+        return buffer.getvalue()
+    return pixmap.tobytes("png")
+
+
+def render_page_pixmap(page: "fitz.Page", dpi: int, grayscale: bool = False) -> "fitz.Pixmap":
+    import fitz
+
+    colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+    return page.get_pixmap(dpi=dpi, colorspace=colorspace)
+
+
+def encode_page_image(
+    pixmap: "fitz.Pixmap", options: ImageOptions, render_seconds: float = 0.0
+) -> PageImage:
+    """Encode a rendered page, timing the encode step."""
+    started = time.perf_counter()
+    data = _encode_pixmap(pixmap, options)
+    return PageImage(
+        data,
+        pixmap.width,
+        pixmap.height,
+        render_seconds,
+        time.perf_counter() - started,
+    )
+
+
+def render_page_image(page: "fitz.Page", options: ImageOptions) -> PageImage:
+    """Rasterize one page and encode it, timing both steps."""
+    started = time.perf_counter()
+    pixmap = render_page_pixmap(page, options.dpi, options.grayscale)
+    return encode_page_image(pixmap, options, time.perf_counter() - started)
+
+
+def _render_pages(
+    pdf_path: str, page_indices: Sequence[int], options: ImageOptions
+) -> List[PageImage]:
+    """Render and encode pages; runs inside a pool worker."""
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        return [
+            render_page_image(doc.load_page(page_index), options)
+            for page_index in page_indices
+        ]
+
+
+def _iter_page_images(
+    doc: "fitz.Document",
+    pdf_path: str,
+    base_name: str,
+    options: ImageOptions,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> Iterator[Tuple[str, bytes]]:
+    """Yield each page's archive entry, then a manifest.json of per-page stats."""
+    started = time.perf_counter()
+    page_count = doc.page_count
+    workers = 1
+    if page_count >= PDF_RENDER_PARALLEL_MIN_PAGES:
+        workers = min(PDF_RENDER_WORKERS, page_count)
+    images = _iter_pool_results(_render_pages, pdf_path, range(page_count), workers, options)
+
+    ext = "jpg" if options.format == "jpeg" else options.format
+    pages = []
+    for page_number, image in enumerate(images, start=1):
+        observe_stage("page_render", image.render_seconds)
+        observe_stage("page_encode", image.encode_seconds)
+        arcname = f"{base_name}_page_{page_number}.{ext}"
+        pages.append(
+            {
+                "page": page_number,
+                "file": arcname,
+                "width": image.width,
+                "height": image.height,
+                "bytes": len(image.data),
+                "render_ms": round(image.render_seconds * 1000, 2),
+                "encode_ms": round(image.encode_seconds * 1000, 2),
+            }
+        )
+        yield arcname, image.data
+        if progress_callback:
+            progress_callback(page_number, page_count)
+
+    record_pages("to_image", len(pages), time.perf_counter() - started)
+    summary = {
+        "options": options._asdict(),
+        "pages": len(pages),
+        "total_bytes": sum(page["bytes"] for page in pages),
+        "render_ms": round(sum(page["render_ms"] for page in pages), 2),
+        "encode_ms": round(sum(page["encode_ms"] for page in pages), 2),
+    }
+    yield MANIFEST_NAME, json.dumps({"summary": summary, "pages": pages}, indent=2).encode()
+
+
+def read_images_manifest(zip_path: str) -> Dict[str, Any]:
+    """Return the manifest summary stored in an image archive."""
+    with ZipFile(zip_path) as zip_file:
+        return json.loads(zip_file.read(MANIFEST_NAME))["summary"]
+
+
+def create_images_zip(
+    pdf_path: str,
+    zip_path: str,
+    base_name: str,
+    options: ImageOptions = ImageOptions(),
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    """Render PDF pages and store them, with a stats manifest, inside a zip archive."""
+    import fitz
+
     with fitz.open(pdf_path) as doc:
         if doc.page_count == 0:
             raise ValueError("No pages found in PDF.")
 
-        for page_index in range(doc.page_count):
-            page = doc.load_page(page_index)
-            pix = page.get_pixmap()
-            image_path = os.path.join(
-                session_folder, f"{base_name}_page_{page_index + 1}.png"
+        with ZipFile(zip_path, "w", compression=options.zip_compression) as zip_file:
+            entries = _iter_page_images(doc, pdf_path, base_name, options, progress_callback)
+            for arcname, data in entries:
+                with track_stage("zip_write"):
+                    zip_file.writestr(arcname, data)
+
+
+def open_images_zip_stream(
+    pdf_path: str, base_name: str, options: ImageOptions = ImageOptions()
+) -> Iterator[bytes]:
+    """Open the PDF eagerly and return a generator streaming its pages as a zip."""
+    import fitz
+
+    doc = fitz.open(pdf_path)
+    if doc.page_count == 0:
+        doc.close()
+        raise ValueError("No pages found in PDF.")
+
+    def generate() -> Iterator[bytes]:
+        try:
+            entries = _iter_page_images(doc, pdf_path, base_name, options)
+            yield from iter_zip_stream(entries, options.zip_compression)
+        finally:
+            doc.close()
+
+    return generate()
+
+
+OCR_OUTPUTS = {"text": ".txt", "pdf": ".pdf"}
+
+
+class OcrOptions(NamedTuple):
+    """How pages are recognized and what the conversion produces."""
+
+    output: str = "text"
+    lang: str = "eng"
+    dpi: int = 300
+    # Recognize pages that already have a text layer too.
+    force: bool = False
+
+    def validate(self) -> "OcrOptions":
+        if self.output not in OCR_OUTPUTS:
+            raise ValueError(f"Unsupported OCR output: {self.output}")
+        if importlib.util.find_spec("pytesseract") is None or not shutil.which(TESSERACT_CMD):
+            raise ValueError("OCR requires pytesseract and the tesseract program.")
+        return self
+
+    @property
+    def ext(self) -> str:
+        return OCR_OUTPUTS[self.output]
+
+
+class OcrPage(NamedTuple):
+    # UTF-8 text, or a one-page PDF holding only the invisible text layer.
+    data: bytes
+    render_seconds: float
+    ocr_seconds: float
+
+
+def _ocr_pages(
+    pdf_path: str, page_indices: Sequence[int], options: OcrOptions
+) -> List[OcrPage]:
+    """Pool worker: render pages as grayscale images and recognize them."""
+    import fitz
+    import pytesseract
+    from PIL import Image
+
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    results = []
+    with fitz.open(pdf_path) as doc:
+        for page_index in page_indices:
+            started = time.perf_counter()
+            pixmap = render_page_pixmap(doc.load_page(page_index), options.dpi, grayscale=True)
+            image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+            rendered = time.perf_counter()
+            if options.output == "pdf":
+                # textonly_pdf leaves the image out, so the layer can go over the original page.
+                data = pytesseract.image_to_pdf_or_hocr(
+                    image,
+                    extension="pdf",
+                    lang=options.lang,
+                    config=f"--dpi {options.dpi} -c textonly_pdf=1",
+                )
+            else:
+                text = pytesseract.image_to_string(
+                    image, lang=options.lang, config=f"--dpi {options.dpi}"
+                )
+                data = text.encode("utf-8")
+            results.append(OcrPage(data, rendered - started, time.perf_counter() - rendered))
+    return results
+
+
+def ocr_pdf(
+    pdf_path: str,
+    output_path: str,
+    content_hash: str,
+    pages: Optional[str] = None,
+    options: OcrOptions = OcrOptions(),
+    progress_callback: Optional[ProgressCallback] = None,
+) -> None:
+    """Make a scanned PDF searchable: write its text, or a copy with a text layer.
+
+    Pages that already carry text are used as they are unless ``options.force``
+    is set. The rest are recognized in the PDF process pool, and each recognized
+    page is cached under the document hash, language, resolution and output
+    type, so a repeat or a different page range only recognizes pages that were
+    never seen with those settings. Text and PDF output need different tesseract
+    renderers, so they do not share recognized pages.
+    """
+    import fitz
+
+    # Imported here: the spawned pool workers load this module to run _ocr_pages
+    # and must not each index the result cache folder.
+    from app.services.result_cache import RESULT_CACHE
+
+    started = time.perf_counter()
+    with fitz.open(pdf_path) as doc:
+        if doc.page_count == 0:
+            raise ValueError("No pages found in PDF.")
+        page_indices = select_pages(pages, doc.page_count)
+        texts: Dict[int, str] = {}
+        if not options.force:
+            for page_index in page_indices:
+                text = doc.load_page(page_index).get_text()
+                if text.strip():
+                    texts[page_index] = text
+
+        # The whole-document force flag does not change how a single page reads.
+        keys = {
+            page_index: RESULT_CACHE.make_key(
+                content_hash,
+                "ocr_page",
+                page=page_index + 1,
+                output=options.output,
+                lang=options.lang,
+                dpi=options.dpi,
             )
-            pix.save(image_path)
-            image_paths.append(image_path)
+            for page_index in page_indices
+            if page_index not in texts
+        }
+        recognized: Dict[int, bytes] = {}
+        for page_index, key in keys.items():
+            data = RESULT_CACHE.read(key)
+            if data is not None:
+                recognized[page_index] = data
+
+        done = len(texts) + len(recognized)
+        if progress_callback and done:
+            progress_callback(done, len(page_indices))
+        missing = [page_index for page_index in keys if page_index not in recognized]
+        if missing:
+            workers = min(PDF_OCR_WORKERS, len(missing))
+            results = _iter_pool_results(_ocr_pages, pdf_path, missing, workers, options)
+            for page_index, result in zip(missing, results):
+                observe_stage("page_render", result.render_seconds)
+                observe_stage("ocr", result.ocr_seconds)
+                RESULT_CACHE.put_bytes(keys[page_index], result.data, options.ext)
+                recognized[page_index] = result.data
+                done += 1
+                if progress_callback:
+                    progress_callback(done, len(page_indices))
 
-    with ZipFile(zip_path, "w") as zip_file:
-        for image_path in image_paths:
-            zip_file.write(image_path, arcname=os.path.basename(image_path))
+        if options.output == "pdf":
+            with track_stage("ocr_pdf_write"):
+                for page_index, data in recognized.items():
+                    page = doc.load_page(page_index)
+                    with fitz.open("pdf", data) as layer:
+                        page.show_pdf_page(page.rect, layer, 0)
+                if pages:
+                    doc.select(page_indices)
+                doc.save(output_path, garbage=3, deflate=True)
+        else:
+            # Pages are separated by form feeds, as tesseract does.
+            with open(output_path, "w", encoding="utf-8") as handle:
+                handle.write(
+                    "\f".join(
+                        texts.get(page_index) or recognized[page_index].decode("utf-8")
+                        for page_index in page_indices
+                    )
+                )
+    record_pages("ocr", len(missing), time.perf_counter() - started)
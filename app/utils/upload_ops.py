@@ -0,0 +1,269 @@
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, List, Optional
+
+from fastapi import Request
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import PDF_UPLOAD_MAX_BYTES
+from app.services.executors import DOWNLOAD_EXECUTOR
+from app.services.metrics import track_stage
+
+# The PDF header may follow a little leading junk, as readers allow.
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+# Allowance for boundaries and part headers when checking Content-Length up front.
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Part data is buffered up to this many bytes before it is hashed and written.
+FLUSH_BYTES = 1024 * 1024
+
+
+class UploadRejected(ValueError):
+    """Raised when an upload is not an acceptable PDF; the message is client-facing."""
+
+
+@dataclass
+class ReceivedUpload:
+    field_name: str
+    filename: str
+    path: str
+    content_hash: str
+    size: int
+
+
+def pdf_upload_openapi(field_name: str = "file", multiple: bool = False) -> Dict:
+    """OpenAPI request body for routes that read their PDF upload from the raw stream."""
+    schema = {"type": "string", "format": "binary"}
+    if multiple:
+        schema = {"type": "array", "items": schema}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field_name],
+                        "properties": {field_name: schema},
+                    }
+                }
+            },
+        }
+    }
+
+
+class _PdfPartWriter:
+    """Hashes one file part, checks its PDF header and writes it to its final path.
+
+    ``write`` runs in the parser callbacks on the event loop, so it only checks
+    and buffers; ``flush`` and ``finish`` do the hashing and file I/O and are
+    called from a worker thread.
+    """
+
+    def __init__(self, field_name: str, filename: str, folder: str, max_bytes: int) -> None:
+        self.field_name = field_name
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.path = os.path.join(folder, uuid.uuid4().hex + ".pdf")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.pending_bytes = 0
+        self._head: Optional[bytearray] = bytearray()
+        self._pending: List[bytes] = []
+        self._handle: Optional[BinaryIO] = None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadRejected(
+                f"File exceeds the maximum upload size of {self.max_bytes} bytes."
+            )
+        if self._head is not None:
+            self._head += data
+            if len(self._head) >= PDF_MAGIC_WINDOW:
+                self._check_magic()
+        self._pending.append(data)
+        self.pending_bytes += len(data)
+
+    def flush(self) -> None:
+        if self._handle is None:
+            self._handle = open(self.path, "wb")
+        data = b"".join(self._pending)
+        self._pending.clear()
+        self.pending_bytes = 0
+        self.digest.update(data)
+        self._handle.write(data)
+
+    def _check_magic(self) -> None:
+        if PDF_MAGIC not in self._head[:PDF_MAGIC_WINDOW]:
+            raise UploadRejected("Uploaded file is not a PDF.")
+        self._head = None
+
+    def finish(self) -> ReceivedUpload:
+        if self._head is not None:
+            self._check_magic()
+        self.flush()
+        self._handle.close()
+        return ReceivedUpload(
+            self.field_name, self.filename, self.path, self.digest.hexdigest(), self.size
+        )
+
+    def discard(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class PdfUploadReceiver:
+    """Streams the PDF parts of a multipart body straight to their final files.
+
+    Unlike ``UploadFile``, nothing is spooled to a temporary file first; each
+    part is validated as it arrives, and the upload is rejected as soon as it is
+    over the size limit or does not start like a PDF. Hashing and writing happen
+    on DOWNLOAD_EXECUTOR between body chunks, never on the event loop.
+    """
+
+    def __init__(self, folder: str, max_bytes: int, max_files: int) -> None:
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.received: List[ReceivedUpload] = []
+        self._current: Optional[_PdfPartWriter] = None
+        self._ended: List[_PdfPartWriter] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        if b"filename" not in options:
+            # Plain form fields are not used by the PDF routes.
+            return
+        filename = options[b"filename"].decode("utf-8", "replace")
+        if not filename.lower().endswith(".pdf"):
+            raise UploadRejected("Please upload a PDF file.")
+        if len(self.received) + len(self._ended) >= self.max_files:
+            raise UploadRejected(f"Too many files; at most {self.max_files} per request.")
+        field_name = options.get(b"name", b"").decode("utf-8", "replace")
+        self._current = _PdfPartWriter(field_name, filename, self.folder, self.max_bytes)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is not None:
+            self._current.write(data[start:end])
+
+    def on_part_end(self) -> None:
+        if self._current is not None:
+            self._ended.append(self._current)
+            self._current = None
+
+    def _needs_flush(self) -> bool:
+        return bool(self._ended) or (
+            self._current is not None and self._current.pending_bytes >= FLUSH_BYTES
+        )
+
+    def flush(self) -> None:
+        """Write buffered part data and complete the parts that ended."""
+        while self._ended:
+            writer = self._ended.pop(0)
+            try:
+                self.received.append(writer.finish())
+            except BaseException:
+                writer.discard()
+                raise
+        if self._current is not None:
+            self._current.flush()
+
+    def discard(self) -> None:
+        for writer in self._ended:
+            writer.discard()
+        self._ended.clear()
+        if self._current is not None:
+            self._current.discard()
+            self._current = None
+        for upload in self.received:
+            if os.path.exists(upload.path):
+                os.remove(upload.path)
+        self.received.clear()
+
+    async def receive(self, request: Request) -> List[ReceivedUpload]:
+        content_type, params = parse_options_header(request.headers.get("content-type"))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise UploadRejected("Expected a multipart/form-data upload.")
+
+        content_length = request.headers.get("content-length")
+        limit = self.max_bytes * self.max_files + MULTIPART_OVERHEAD
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            raise UploadRejected(
+                f"File exceeds the maximum upload size of {self.max_bytes} bytes."
+            )
+
+        parser = MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": self.on_part_begin,
+                "on_header_field": self.on_header_field,
+                "on_header_value": self.on_header_value,
+                "on_header_end": self.on_header_end,
+                "on_headers_finished": self.on_headers_finished,
+                "on_part_data": self.on_part_data,
+                "on_part_end": self.on_part_end,
+            },
+        )
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                if self._needs_flush():
+                    await DOWNLOAD_EXECUTOR.run(self.flush)
+            parser.finalize()
+            if self._ended or self._current is not None:
+                await DOWNLOAD_EXECUTOR.run(self.flush)
+        except FormParserError as exc:
+            self.discard()
+            raise UploadRejected("Invalid multipart data.") from exc
+        except BaseException:
+            self.discard()
+            raise
+
+        if not self.received:
+            raise UploadRejected("Please upload a PDF file.")
+        return self.received
+
+
+async def receive_pdf_uploads(
+    request: Request,
+    folder: str,
+    max_files: int,
+    max_bytes: int = PDF_UPLOAD_MAX_BYTES,
+) -> List[ReceivedUpload]:
+    """Stream every PDF part of the request body into folder."""
+    with track_stage("pdf_upload"):
+        return await PdfUploadReceiver(folder, max_bytes, max_files).receive(request)
+
+
+async def receive_pdf_upload(
+    request: Request, folder: str, max_bytes: int = PDF_UPLOAD_MAX_BYTES
+) -> ReceivedUpload:
+    """Stream the single PDF part of the request body into folder."""
+    uploads = await receive_pdf_uploads(request, folder, 1, max_bytes)
+    return uploads[0]
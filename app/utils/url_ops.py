@@ -0,0 +1,43 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a link was shared from.
+TRACKING_PARAMS = {
+    "si",
+    "feature",
+    "pp",
+    "fbclid",
+    "gclid",
+    "is_from_webapp",
+    "sender_device",
+    "_r",
+    "_t",
+}
+
+
+def _is_tracking_param(name: str) -> bool:
+    return name in TRACKING_PARAMS or name.startswith("utm_")
+
+
+def normalize_media_url(url: str) -> str:
+    """Canonical form of a video URL so equivalent links map to the same job."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    path = parts.path.rstrip("/") or "/"
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name)
+    ]
+
+    # youtu.be/<id> and youtube.com/shorts/<id> are the same video as watch?v=<id>.
+    if host == "youtu.be" and path != "/":
+        query.append(("v", path.lstrip("/")))
+        host, path = "youtube.com", "/watch"
+    elif host == "youtube.com" and path.startswith("/shorts/"):
+        query.append(("v", path[len("/shorts/"):]))
+        path = "/watch"
+
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
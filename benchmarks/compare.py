@@ -0,0 +1,79 @@
+"""Compare two benchmark result files and fail on regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+
+Exits with status 1 when any case got slower (p50 or p99 latency) or its
+throughput dropped by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# (result field, subfield, whether higher is better)
+CHECKS = (
+    ("latency_ms", "p50", False),
+    ("latency_ms", "p99", False),
+    ("pages_per_second", None, True),
+    ("throughput_rps", None, True),
+)
+
+
+def case_key(result: Dict[str, Any]) -> Tuple:
+    if "scenario" in result:
+        return (result["scenario"],)
+    return (result["operation"], result["fixture"], result["pages"])
+
+
+def _value(result: Dict[str, Any], field: str, subfield: Optional[str]) -> Optional[float]:
+    value = result.get(field)
+    if subfield is not None:
+        value = value.get(subfield) if isinstance(value, dict) else None
+    return value
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> List[str]:
+    """Return one line per regressed metric."""
+    before = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in candidate["results"]:
+        previous = before.get(case_key(result))
+        if previous is None:
+            continue
+        for field, subfield, higher_is_better in CHECKS:
+            old = _value(previous, field, subfield)
+            new = _value(result, field, subfield)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > threshold:
+                name = f"{field}.{subfield}" if subfield else field
+                case = "/".join(str(part) for part in case_key(result))
+                regressions.append(f"{case} {name}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed change (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.candidate) as handle:
+        candidate = json.load(handle)
+    if baseline["environment"].get("cpu_count") != candidate["environment"].get("cpu_count"):
+        print("warning: runs were measured on machines with different CPU counts")
+
+    regressions = compare(baseline, candidate, args.threshold)
+    for line in regressions:
+        print(line)
+    if regressions:
+        sys.exit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
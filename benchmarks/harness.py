@@ -0,0 +1,120 @@
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = {
+    "sample": os.path.join(REPO_ROOT, "pdf_uploads", "sample.pdf"),
+    "seventhgig": os.path.join(REPO_ROOT, "pdf_uploads", "SeventhGig_RamezKhalifa.pdf"),
+}
+RESULTS_FOLDER = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of values."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, Optional[float]]:
+    """p50/p90/p99, mean and max of latencies, in milliseconds."""
+    if not seconds:
+        return {"p50": None, "p90": None, "p99": None, "mean": None, "max": None}
+    return {
+        "p50": round(percentile(seconds, 50) * 1000, 2),
+        "p90": round(percentile(seconds, 90) * 1000, 2),
+        "p99": round(percentile(seconds, 99) * 1000, 2),
+        "mean": round(sum(seconds) / len(seconds) * 1000, 2),
+        "max": round(max(seconds) * 1000, 2),
+    }
+
+
+def peak_rss_kib() -> Dict[str, int]:
+    """Peak resident memory of this process and of its largest finished child."""
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def _proc_peak_rss_kib(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as handle:
+            for line in handle:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _proc_children(pid: int) -> List[int]:
+    children: List[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as handle:
+                children.extend(int(child) for child in handle.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def process_tree_peak_rss_kib(pid: int) -> Dict[str, Optional[int]]:
+    """Peak RSS of a running process and of its largest live child (Linux only)."""
+    children = [_proc_peak_rss_kib(child) for child in _proc_children(pid)]
+    children = [value for value in children if value is not None]
+    return {
+        "self": _proc_peak_rss_kib(pid),
+        "children": max(children) if children else None,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """What a run was measured on, so results are only compared like for like."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_results(
+    suite: str, config: Dict[str, Any], results: List[Dict[str, Any]], output: Optional[str]
+) -> str:
+    """Write a run as JSON and return its path."""
+    if output is None:
+        os.makedirs(RESULTS_FOLDER, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_FOLDER, f"{suite}-{stamp}.json")
+    payload = {
+        "suite": suite,
+        "environment": environment(),
+        "config": config,
+        "results": results,
+    }
+    with open(output, "w") as handle:
+        json.dump(payload, handle, indent=2)
+    return output
+
+
+def log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
@@ -0,0 +1,236 @@
+"""Load-test the FastAPI app end to end against local stub media servers.
+
+Starts the app under uvicorn in a scratch directory, points yt-dlp and
+YOUTUBE_REMOTE_ENDPOINT at a stub server, and drives each scenario with
+concurrent clients:
+
+    python -m benchmarks.http_bench --requests 20 --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks.harness import (
+    FIXTURES,
+    REPO_ROOT,
+    latency_summary,
+    log,
+    process_tree_peak_rss_kib,
+    write_results,
+)
+from benchmarks.stubs import StubMediaServer
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[int]]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _unique_pdf(data: bytes, index: int) -> bytes:
+    # A trailing comment changes the content hash, so the result cache misses.
+    return data + f"\n%bench-{index}-{time.time_ns()}\n".encode()
+
+
+def _check(response: httpx.Response) -> httpx.Response:
+    response.raise_for_status()
+    if response.headers.get("content-type", "").startswith("application/json"):
+        body = response.json()
+        if isinstance(body, dict) and "error" in body:
+            raise RuntimeError(body["error"])
+    return response
+
+
+async def _download(client: httpx.AsyncClient, path: str, url: str) -> int:
+    response = _check(await client.post(path, params={"url": url}))
+    process_id = response.json()["process_id"]
+    response = _check(
+        await client.get(f"/downloads/{process_id}/file", params={"follow": "true"})
+    )
+    return len(response.content)
+
+
+def build_scenarios(stub_url: str, cached: bool) -> Dict[str, Scenario]:
+    with open(FIXTURES["sample"], "rb") as handle:
+        sample = handle.read()
+    with open(FIXTURES["seventhgig"], "rb") as handle:
+        tables = handle.read()
+    document: Dict[str, str] = {}
+
+    def pdf_scenario(path: str, data: bytes, **params) -> Scenario:
+        async def run(client: httpx.AsyncClient, index: int) -> int:
+            body = data if cached else _unique_pdf(data, index)
+            response = _check(
+                await client.post(path, params=params, files={"file": ("bench.pdf", body)})
+            )
+            return len(response.content)
+
+        return run
+
+    async def page(client: httpx.AsyncClient, index: int) -> int:
+        if "id" not in document:
+            response = _check(
+                await client.post("/pdf/documents", files={"file": ("bench.pdf", sample)})
+            )
+            document.update(id=response.json()["document_id"], pages=response.json()["page_count"])
+        page_number = index % document["pages"] + 1
+        dpi = 72 if cached else 72 + index
+        response = _check(
+            await client.get(
+                f"/pdf/documents/{document['id']}/pages/{page_number}", params={"dpi": dpi}
+            )
+        )
+        return len(response.content)
+
+    async def youtube_remote(client: httpx.AsyncClient, index: int) -> int:
+        return await _download(client, "/youtube/download", f"https://youtu.be/bench{index}")
+
+    async def tiktok_ytdlp(client: httpx.AsyncClient, index: int) -> int:
+        url = f"{stub_url}/media/bench-{index}-{time.time_ns()}.mp4"
+        return await _download(client, "/tiktok/download", url)
+
+    return {
+        "pdf_to_image": pdf_scenario("/pdf/to-image", sample),
+        "pdf_to_image_stream": pdf_scenario("/pdf/to-image", sample, stream="true"),
+        "pdf_to_excel": pdf_scenario("/pdf/to-excel", tables),
+        "pdf_to_word": pdf_scenario("/pdf/to-word", sample),
+        "pdf_page": page,
+        "youtube_remote_download": youtube_remote,
+        "tiktok_ytdlp_download": tiktok_ytdlp,
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: List[str] = []
+    transferred = 0
+
+    async def one(index: int) -> None:
+        nonlocal transferred
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                transferred += await scenario(client, index)
+            except Exception as exc:
+                errors.append(f"{type(exc).__name__}: {exc}")
+                return
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "response_bytes_per_second": round(transferred / elapsed),
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def start_server(workdir: str, port: int, stub_url: str, verbose: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PYTHONPATH=REPO_ROOT,
+        YOUTUBE_REMOTE_ENDPOINT=f"{stub_url}/dl",
+        ENABLED_ROUTERS="youtube,tiktok,downloads,system,pdf",
+        JANITOR_SCHEDULE_PATH=os.path.join(workdir, "janitor_schedule.json"),
+    )
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=workdir,
+        env=env,
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=None if verbose else subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            (await client.get("/system/executors")).raise_for_status()
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    with StubMediaServer(args.media_bytes, args.media_rate) as stub, tempfile.TemporaryDirectory(
+        prefix="http-bench-"
+    ) as workdir:
+        port = _free_port()
+        server = start_server(workdir, port, stub.base_url, args.verbose)
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}", timeout=args.timeout
+            ) as client:
+                await wait_ready(client)
+                scenarios = build_scenarios(stub.base_url, args.cached)
+                for name in args.scenarios.split(","):
+                    log(f"{name}: {args.requests} requests, concurrency {args.concurrency}")
+                    result = await run_scenario(
+                        client, scenarios[name], args.requests, args.concurrency
+                    )
+                    result["server_peak_rss_kib"] = process_tree_peak_rss_kib(server.pid)
+                    results.append(dict(scenario=name, **result))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        default="pdf_to_image,pdf_to_image_stream,pdf_to_excel,pdf_to_word,pdf_page,"
+        "youtube_remote_download,tiktok_ytdlp_download",
+    )
+    parser.add_argument("--requests", type=int, default=20, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cached", action="store_true", help="Reuse inputs so caches hit")
+    parser.add_argument("--media-bytes", type=int, default=5 * 1024 * 1024)
+    parser.add_argument(
+        "--media-rate", type=int, default=None, help="Stub bandwidth in bytes per second"
+    )
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    config = {
+        key: value for key, value in vars(args).items() if key not in ("output", "timeout", "verbose")
+    }
+    log(f"Results written to {write_results('http', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
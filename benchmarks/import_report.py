@@ -0,0 +1,93 @@
+"""Report how long a worker takes to import the app, and which modules cost most.
+
+Each run imports ``main`` in a fresh interpreter with ``-X importtime``, once
+per router set:
+
+    python -m benchmarks.import_report --routers youtube,tiktok,downloads,system --repeat 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.harness import REPO_ROOT, latency_summary, log, write_results
+
+# "import time: self [us] | cumulative | imported package"
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+DEFAULT_ROUTER_SETS = ("youtube,tiktok,downloads,system", "youtube,tiktok,downloads,system,pdf")
+
+
+def import_once(routers: str) -> Dict[str, Any]:
+    """Import main in a fresh interpreter; return wall time and per-module costs."""
+    with tempfile.TemporaryDirectory(prefix="import-report-") as workdir:
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=workdir,
+            env=dict(os.environ, PYTHONPATH=REPO_ROOT, ENABLED_ROUTERS=routers),
+            capture_output=True,
+            text=True,
+        )
+        elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us), int(cumulative_us))
+    return {"seconds": elapsed, "modules": modules}
+
+
+def top_level_packages(modules: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """Total self time per top-level package, largest first."""
+    totals: Dict[str, int] = {}
+    for name, (self_us, _) in modules.items():
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"package": name, "ms": round(us / 1000, 2)} for name, us in ranked]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--routers",
+        action="append",
+        help="ENABLED_ROUTERS value to measure; repeat for several (default: with and without pdf)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Packages listed per router set")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    router_sets = args.routers or list(DEFAULT_ROUTER_SETS)
+    results = []
+    for routers in router_sets:
+        log(f"import main with ENABLED_ROUTERS={routers}")
+        runs = [import_once(routers) for _ in range(args.repeat)]
+        # Per-module numbers come from the fastest run, the least disturbed one.
+        fastest = min(runs, key=lambda run: run["seconds"])
+        results.append(
+            {
+                "scenario": f"import main [{routers}]",
+                "routers": routers,
+                "latency_ms": latency_summary([run["seconds"] for run in runs]),
+                "modules_loaded": len(fastest["modules"]),
+                "top_packages": top_level_packages(fastest["modules"], args.top),
+            }
+        )
+
+    config = {"routers": router_sets, "repeat": args.repeat}
+    log(f"Results written to {write_results('imports', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
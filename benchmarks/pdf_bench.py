@@ -0,0 +1,148 @@
+"""Benchmark the PDF conversions across fixtures and page counts.
+
+Every case runs in a fresh interpreter, so its peak RSS is its own:
+
+    python -m benchmarks.pdf_bench --pages 1,10,50 --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.harness import (
+    FIXTURES,
+    REPO_ROOT,
+    latency_summary,
+    log,
+    peak_rss_kib,
+    write_results,
+)
+
+OPERATIONS = ("images", "excel", "docx")
+
+
+def build_fixture(source: str, pages: int, path: str) -> None:
+    """Write a PDF of exactly ``pages`` pages by repeating the fixture's pages."""
+    import fitz
+
+    with fitz.open(source) as src, fitz.open() as doc:
+        while doc.page_count < pages:
+            last = min(src.page_count, pages - doc.page_count) - 1
+            doc.insert_pdf(src, from_page=0, to_page=last)
+        doc.save(path)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case in this process: a warm-up, then ``repeat`` timed conversions."""
+    from app.services.executors import shutdown_executors
+    from app.utils.pdf_ops import (
+        ImageOptions,
+        convert_pdf_tables_to_excel,
+        convert_pdf_to_docx,
+        create_images_zip,
+    )
+
+    workdir = case["workdir"]
+    pdf_path = os.path.join(workdir, "input.pdf")
+    build_fixture(FIXTURES[case["fixture"]], case["pages"], pdf_path)
+
+    def convert(output_path: str) -> None:
+        if case["operation"] == "images":
+            create_images_zip(pdf_path, output_path, "bench", ImageOptions(dpi=case["dpi"]))
+        elif case["operation"] == "excel":
+            convert_pdf_tables_to_excel(pdf_path, output_path)
+        else:
+            convert_pdf_to_docx(pdf_path, output_path, parallel=case["parallel"])
+
+    ext = {"images": ".zip", "excel": ".xlsx", "docx": ".docx"}[case["operation"]]
+    latencies: List[float] = []
+    output_bytes = 0
+    try:
+        # The warm-up also starts the worker processes, which is not what is measured.
+        convert(os.path.join(workdir, "warmup" + ext))
+        for run in range(case["repeat"]):
+            output_path = os.path.join(workdir, f"run{run}{ext}")
+            started = time.perf_counter()
+            convert(output_path)
+            latencies.append(time.perf_counter() - started)
+            output_bytes = os.path.getsize(output_path)
+    except ValueError as exc:
+        # e.g. "No tables found in PDF." for a fixture without tables.
+        return {"skipped": str(exc)}
+    finally:
+        shutdown_executors()
+
+    total = sum(latencies)
+    return {
+        "runs": len(latencies),
+        "latency_ms": latency_summary(latencies),
+        "pages_per_second": round(case["pages"] * len(latencies) / total, 2),
+        "output_bytes": output_bytes,
+        "peak_rss_kib": peak_rss_kib(),
+    }
+
+
+def run_isolated(case: Dict[str, Any]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="pdf-bench-") as workdir:
+        payload = dict(case, workdir=workdir)
+        # The app creates its output folders relative to the working directory.
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.pdf_bench", "--case", json.dumps(payload)],
+            cwd=workdir,
+            env=dict(os.environ, PYTHONPATH=REPO_ROOT),
+            capture_output=True,
+            text=True,
+        )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--fixtures", default=",".join(FIXTURES))
+    parser.add_argument("--pages", default="1,10,50", help="Page counts to build per fixture")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dpi", type=int, default=72, help="Image DPI for the images operation")
+    parser.add_argument("--parallel", action="store_true", help="Use parallel DOCX mode")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/)")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    config = {
+        "operations": args.operations.split(","),
+        "fixtures": args.fixtures.split(","),
+        "pages": [int(pages) for pages in args.pages.split(",")],
+        "repeat": args.repeat,
+        "dpi": args.dpi,
+        "parallel": args.parallel,
+    }
+    results = []
+    for operation in config["operations"]:
+        for fixture in config["fixtures"]:
+            for pages in config["pages"]:
+                case = {
+                    "operation": operation,
+                    "fixture": fixture,
+                    "pages": pages,
+                    "repeat": args.repeat,
+                    "dpi": args.dpi,
+                    "parallel": args.parallel,
+                }
+                log(f"{operation} {fixture} {pages} pages")
+                results.append(dict(case, **run_isolated(case)))
+
+    log(f"Results written to {write_results('pdf', config, results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Sequence
+from urllib.parse import parse_qs, urlsplit
+
+MEDIA_PATH = re.compile(r"^/media/(?P<name>[\w.-]+)\.mp4$")
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    """Serves synthetic media for yt-dlp and the remote download endpoint.
+
+    ``/media/<name>.mp4`` is a direct video link that yt-dlp's generic
+    extractor downloads as is; ``/dl?url=...`` mimics YOUTUBE_REMOTE_ENDPOINT.
+    Both honour Range requests unless the server is told to ignore them.
+    """
+
+    protocol_version = "HTTP/1.1"
+    server: "StubMediaServer"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self._serve(send_body=False)
+
+    def do_GET(self) -> None:
+        self._serve(send_body=True)
+
+    def _serve(self, send_body: bool) -> None:
+        parts = urlsplit(self.path)
+        match = MEDIA_PATH.match(parts.path)
+        if match:
+            name = match.group("name")
+        elif parts.path == "/dl" and parse_qs(parts.query).get("url"):
+            name = "remote"
+        else:
+            self.send_error(404)
+            return
+
+        self.server.ranges.append(self.headers.get("Range"))
+        size = self.server.media_bytes
+        start = 0
+        range_header = self.headers.get("Range") if self.server.honour_range else None
+        range_match = re.match(r"bytes=(\d+)-", range_header or "")
+        if range_match and int(range_match.group(1)) >= size:
+            self.send_response(416)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if range_match:
+            start = int(range_match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        if self.server.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(size - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Disposition", f'attachment; filename="{name}.mp4"')
+        self.end_headers()
+        if send_body:
+            self._send_body(start, size, self.server.next_drop())
+
+    def _send_body(self, start: int, size: int, drop_after: Optional[int]) -> None:
+        chunk_size = self.server.chunk_size
+        payload = self.server.payload
+        delay = chunk_size / self.server.bytes_per_second if self.server.bytes_per_second else 0
+        stop = size if drop_after is None else min(size, start + drop_after)
+        position = start
+        while position < stop:
+            end = min(position + chunk_size, stop)
+            offset = position % len(payload)
+            chunk = (payload[offset:] + payload)[: end - position]
+            try:
+                if self.server.chunked:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                else:
+                    self.wfile.write(chunk)
+            except OSError:
+                return
+            position = end
+            if delay:
+                time.sleep(delay)
+        if drop_after is not None:
+            # Cut the connection before the response is complete.
+            self.close_connection = True
+            self.wfile.flush()
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return
+        if self.server.chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+
+class StubMediaServer(ThreadingHTTPServer):
+    """Local media server run in a background thread; use as a context manager.
+
+    Each entry of ``drops`` cuts one response short after that many body bytes,
+    in request order, to exercise resumed downloads. ``honour_range=False`` makes
+    the server always answer 200 with the whole file, and ``chunked`` sends
+    responses without a Content-Length.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        media_bytes: int = 5 * 1024 * 1024,
+        bytes_per_second: Optional[int] = None,
+        port: int = 0,
+        chunk_size: int = 64 * 1024,
+        drops: Sequence[int] = (),
+        honour_range: bool = True,
+        chunked: bool = False,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), _MediaHandler)
+        self.media_bytes = media_bytes
+        self.bytes_per_second = bytes_per_second
+        self.chunk_size = chunk_size
+        self.honour_range = honour_range
+        self.chunked = chunked
+        # Range header of every request served, None when there was none.
+        self.ranges: List[Optional[str]] = []
+        self._drops = list(drops)
+        self._drops_lock = threading.Lock()
+        self.payload = bytes(index % 251 for index in range(chunk_size))
+        self._thread: Optional[threading.Thread] = None
+
+    def next_drop(self) -> Optional[int]:
+        with self._drops_lock:
+            return self._drops.pop(0) if self._drops else None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubMediaServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+        self.server_close()
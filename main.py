@@ -1,14 +1,48 @@
+import time
+
+_import_started = time.perf_counter()
+
+import importlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.routes.tiktok import router as tiktok_router
-from app.routes.youtube import router as youtube_router
-from app.routes.downloads import router as downloads_router
-# from app.routes.pdf import router as pdf_router
+from app.config import ENABLED_ROUTERS, ensure_folders
+from app.downloaders.youtube import YOUTUBE_DOWNLOADER
+from app.services.download_tracker import DOWNLOAD_TRACKER
+from app.services.executors import shutdown_executors
+from app.services.metrics import METRICS, MetricsMiddleware
+from app.services.janitor import FILE_JANITOR
+
+# Router modules by the names used in ENABLED_ROUTERS; only enabled ones are imported.
+ROUTERS = {
+    "youtube": "app.routes.youtube",
+    "tiktok": "app.routes.tiktok",
+    "downloads": "app.routes.downloads",
+    "system": "app.routes.system",
+    "pdf": "app.routes.pdf",
+}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ensure_folders()
+    FILE_JANITOR.start()
+    yield
+    await YOUTUBE_DOWNLOADER.aclose()
+    shutdown_executors()
+    DOWNLOAD_TRACKER.close()
+    FILE_JANITOR.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
-app = FastAPI()
+for name in ENABLED_ROUTERS:
+    if name not in ROUTERS:
+        raise ValueError(f"Unknown router in ENABLED_ROUTERS: {name}")
+    app.include_router(importlib.import_module(ROUTERS[name]).router)
 
-# Enable YouTube routes for current testing focus
-app.include_router(youtube_router)
-app.include_router(tiktok_router)
-app.include_router(downloads_router)
-# app.include_router(pdf_router)  # Temporarily disable PDF conversion endpoints
+METRICS.gauge(
+    "app_import_seconds", "Time taken to import the app and its enabled routers."
+).set(time.perf_counter() - _import_started)
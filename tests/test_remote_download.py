@@ -0,0 +1,88 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from app.downloaders import youtube
+from app.downloaders.youtube import RemoteYouTubeDownloader
+from app.services.download_tracker import DOWNLOAD_TRACKER
+from benchmarks.stubs import StubMediaServer
+
+MEDIA_BYTES = 300_000
+CHUNK_SIZE = 64 * 1024
+
+
+def expected_media() -> bytes:
+    """The bytes StubMediaServer serves for MEDIA_BYTES."""
+    return bytes((index % CHUNK_SIZE) % 251 for index in range(MEDIA_BYTES))
+
+
+@pytest.fixture
+def scheduled_deletions(monkeypatch):
+    deletions = []
+    monkeypatch.setattr(
+        youtube, "delete_file_later", lambda path, delay=300: deletions.append(path)
+    )
+    return deletions
+
+
+def run_download(stub: StubMediaServer, folder: str, max_resumes: int = 3):
+    job = DOWNLOAD_TRACKER.create_job(source="youtube", url="https://example.com/v")
+
+    async def download():
+        async with httpx.AsyncClient() as client:
+            downloader = RemoteYouTubeDownloader(
+                f"{stub.base_url}/dl", folder, client=client, max_resumes=max_resumes
+            )
+            await downloader.download("https://example.com/v", job.process_id)
+
+    asyncio.run(download())
+    return DOWNLOAD_TRACKER.get_job(job.process_id)
+
+
+def test_resumes_with_range_after_dropped_connection(tmp_path, scheduled_deletions):
+    with StubMediaServer(MEDIA_BYTES, chunk_size=CHUNK_SIZE, drops=[100_000]) as stub:
+        job = run_download(stub, str(tmp_path))
+
+    assert stub.ranges == [None, "bytes=100000-"]
+    assert job.status == "completed"
+    with open(job.file_path, "rb") as handle:
+        assert handle.read() == expected_media()
+
+
+def test_treats_416_on_resume_as_complete(tmp_path, scheduled_deletions):
+    # A chunked response cut before its last chunk fails after every byte arrived.
+    with StubMediaServer(
+        MEDIA_BYTES, chunk_size=CHUNK_SIZE, drops=[MEDIA_BYTES], chunked=True
+    ) as stub:
+        job = run_download(stub, str(tmp_path))
+
+    assert stub.ranges == [None, f"bytes={MEDIA_BYTES}-"]
+    assert job.status == "completed"
+    with open(job.file_path, "rb") as handle:
+        assert handle.read() == expected_media()
+
+
+def test_restarts_when_server_ignores_range(tmp_path, scheduled_deletions):
+    with StubMediaServer(
+        MEDIA_BYTES, chunk_size=CHUNK_SIZE, drops=[100_000], honour_range=False
+    ) as stub:
+        job = run_download(stub, str(tmp_path))
+
+    assert stub.ranges == [None, "bytes=100000-"]
+    assert job.status == "completed"
+    with open(job.file_path, "rb") as handle:
+        assert handle.read() == expected_media()
+
+
+def test_schedules_partial_file_deletion_when_resumes_run_out(tmp_path, scheduled_deletions):
+    with StubMediaServer(
+        MEDIA_BYTES, chunk_size=CHUNK_SIZE, drops=[1_000, 1_000]
+    ) as stub:
+        with pytest.raises(RuntimeError, match="Failed to reach remote API"):
+            run_download(stub, str(tmp_path), max_resumes=1)
+
+    partial_files = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    assert len(partial_files) == 1
+    assert scheduled_deletions == partial_files